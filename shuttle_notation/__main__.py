@@ -0,0 +1,48 @@
+# Parse notation from other programs: python -m shuttle_notation [--socket PATH] [--defaults JSON] [--aliases JSON]
+# Reads JSON-lines requests on stdin and writes JSON-lines responses on stdout, or serves them on
+#   a Unix socket if a path is given. See parsing/service.py for the protocol.
+
+import argparse
+import json
+import sys
+from decimal import Decimal
+from fractions import Fraction
+
+from shuttle_notation.parsing.full_parse import Parser
+import shuttle_notation.parsing.service as service
+
+NUMERIC_TYPES = {"decimal": Decimal, "float": float, "fraction": Fraction}
+
+def main():
+    arguments = argparse.ArgumentParser(prog="python -m shuttle_notation", description="Shuttle notation parser")
+    arguments.add_argument("--socket", help="serve on this Unix socket path instead of stdin/stdout")
+    arguments.add_argument("--defaults", default="{}", help='default args as JSON, e.g. {"time": 1, "sus": 0.5}')
+    arguments.add_argument("--aliases", default="{}", help='arg aliases as JSON, e.g. {">": "sus"}')
+    arguments.add_argument("--numeric", choices=list(NUMERIC_TYPES), default="decimal", help="type of arg values")
+    arguments.add_argument("--cache-size", type=int, default=1024, help="parse results kept in memory")
+    arguments.add_argument("--cache-directory", help="keep parse results on disk in this directory")
+    arguments.add_argument("--max-length", type=int, default=service.DEFAULT_MAX_LENGTH,
+                           help="refuse sources that expand to more elements than this, 0 for no limit")
+    options = arguments.parse_args()
+
+    numeric = NUMERIC_TYPES[options.numeric]
+    parser = Parser(options.cache_size, numeric, options.cache_directory)
+    # Parsed as strings, so that values are exact for Decimal and Fraction
+    parser.arg_defaults = {name: numeric(str(value)) for name, value in json.loads(options.defaults).items()}
+    parser.arg_aliases = json.loads(options.aliases)
+
+    max_length = options.max_length or None
+
+    if options.socket is None:
+        service.serve_stream(parser, sys.stdin, sys.stdout, max_length)
+        return 0
+
+    with service.ParseServer(options.socket, parser, max_length) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
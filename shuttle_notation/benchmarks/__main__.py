@@ -0,0 +1,41 @@
+# Run the benchmark suite: python -m shuttle_notation.benchmarks [--scale S] [--output FILE] [--save-baseline]
+# Exits with status 1 if any stage is slower than the stored baseline allows.
+
+import argparse
+import os
+import sys
+
+from shuttle_notation.benchmarks import suite
+
+def main():
+    arguments = argparse.ArgumentParser(description="Shuttle notation benchmark suite")
+    arguments.add_argument("--scale", type=float, default=1.0, help="corpus size multiplier")
+    arguments.add_argument("--repeats", type=int, default=5, help="runs per timing, best is kept")
+    arguments.add_argument("--output", help="write results as JSON to this file")
+    arguments.add_argument("--baseline", default=suite.BASELINE_PATH, help="baseline JSON to compare against")
+    arguments.add_argument("--tolerance", type=float, default=suite.DEFAULT_TOLERANCE)
+    arguments.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    options = arguments.parse_args()
+
+    results = suite.run(options.scale, options.repeats)
+    baseline = suite.load(options.baseline) if os.path.exists(options.baseline) else None
+    print(suite.report(results, baseline))
+
+    if options.output:
+        suite.save(results, options.output)
+
+    if options.save_baseline:
+        suite.save(results, options.baseline)
+        return 0
+
+    if baseline is not None:
+        regressions = suite.compare(results, baseline, options.tolerance)
+        for corpus, stage, expected, seconds in regressions:
+            print(f"REGRESSION: {corpus} {stage}: {seconds:.4f}s, baseline {expected:.4f}s")
+        if regressions:
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+# Re-resolving a compiled sequence under new defaults, compared to parsing again.
+# Run with: python -m shuttle_notation.benchmarks.compile_benchmark
+
+import time
+from decimal import Decimal
+
+from shuttle_notation.benchmarks import corpora
+from shuttle_notation.parsing.full_parse import Parser
+
+def main():
+    source = corpora.many_arguments(2000) + " " + corpora.reference_arguments(2000)
+    parser = Parser(cache_size = 0)
+    defaults = [
+        {"sus": Decimal("1.0"), "amp": Decimal("1.0"), "time": Decimal(tempo) / 4}
+        for tempo in range(1, 21)
+    ]
+
+    start = time.perf_counter()
+    for values in defaults:
+        parser.arg_defaults = values
+        parser.parse(source)
+    parsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = parser.compile(source)
+    for values in defaults:
+        compiled.resolve(values)
+    resolved = time.perf_counter() - start
+
+    print(f"{len(defaults)} tempo changes, {len(compiled)} elements")
+    print(f"parse():              {parsed:.3f}s")
+    print(f"compile() + resolve(): {resolved:.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# Generated notation strings for the benchmark suite, each stressing one kind of structure.
+# All generators take a size and return a deterministic source string.
+
+def deep_nesting(size: int) -> str:
+    return "(" * size + "a1 b2" + ")" * size
+
+def wide_alternation(size: int) -> str:
+    return "c1 (" + " / ".join("n" + str(i % 10) for i in range(size)) + ")"
+
+# Alternations nested in alternations, multiplying the cycle length at each level
+def nested_alternation(size: int) -> str:
+    source = "x1 / y2"
+    for i in range(size):
+        source = "a" + str(i % 10) + " / (" + source + ")"
+    return "(" + source + ")"
+
+def huge_repetition(size: int) -> str:
+    return "(a1 (b2 / c3 / d4) e5*4)*" + str(size)
+
+def many_arguments(size: int) -> str:
+    return " ".join(
+        "c" + str(i % 10) + ":0.25,amp0." + str(i % 9 + 1) + ",sus*1.5,pan-0.2,lpf+" + str(100 + i % 50)
+        for i in range(size)
+    )
+
+# Args referring to the values of other args, e.g. sus1time
+def reference_arguments(size: int) -> str:
+    return "(" + " ".join(
+        "c" + str(i % 10) + ":sus0." + str(i % 9 + 1) + "time,amp1.5sus"
+        for i in range(size)
+    ) + "):0.5"
+
+def long_flat(size: int) -> str:
+    return " ".join("c" + str(i % 10) for i in range(size))
+
+# name: (generator, size at scale 1)
+CORPORA = {
+    "deep_nesting": (deep_nesting, 2000),
+    "wide_alternation": (wide_alternation, 2000),
+    "nested_alternation": (nested_alternation, 10),
+    "huge_repetition": (huge_repetition, 20000),
+    "many_arguments": (many_arguments, 2000),
+    "reference_arguments": (reference_arguments, 2000),
+    "long_flat": (long_flat, 20000),
+}
+
+def generate(scale: float = 1.0) -> dict[str, str]:
+    return {name: generator(max(1, int(size * scale))) for name, (generator, size) in CORPORA.items()}
@@ -0,0 +1,29 @@
+# Computing a single loop iteration directly, against expanding the full alternation cycle.
+# Run with: python -m shuttle_notation.benchmarks.loop_benchmark
+
+import time
+
+from shuttle_notation.benchmarks import corpora
+import shuttle_notation.parsing.section_parsing as section_parsing
+import shuttle_notation.parsing.util as util
+from shuttle_notation.parsing.loop_sequence import LoopSequence
+
+def main():
+    for size in [8, 10, 12]:
+        source = corpora.nested_alternation(size) + " " + corpora.wide_alternation(50)
+        top_element = section_parsing.build_tree(source)
+
+        loop = LoopSequence(top_element)
+        start = time.perf_counter()
+        iteration = loop.iteration(loop.cycle_length // 2)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        full = util.TreeExpander().tree_expand(top_element)
+        expanded = time.perf_counter() - start
+
+        print(f"nesting {size:2}: cycle of {loop.cycle_length} iterations ({len(full)} elements) in {expanded:.3f}s,"
+              f" iteration {loop.cycle_length // 2} ({len(iteration)} elements) in {single * 1000:.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# Peak memory of parsing a sequence that expands to 1M elements, measured with tracemalloc.
+# Run with: python -m shuttle_notation.benchmarks.memory_benchmark
+
+import time
+import tracemalloc
+from decimal import Decimal
+
+from shuttle_notation.parsing.full_parse import Parser
+
+# About 670 distinct leaves with mostly identical args, expanded to 1M elements
+SOURCE = "(" + " ".join(
+    "(c" + str(i % 7) + ":amp0." + str(i % 3 + 1) + " d" + str(i % 5) + " (e1 / f2:sus2))"
+    for i in range(167)
+) + ")*1000:0.25"
+
+def measure(parser: Parser):
+    parser.arg_defaults = {"sus": Decimal("1.0"), "amp": Decimal("1.0")}
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = parser.parse(SOURCE)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return len(result), peak, elapsed
+
+def main():
+    for label, parser in [("uncached", Parser(cache_size = 0)), ("cached", Parser())]:
+        length, peak, elapsed = measure(parser)
+        print(f"{label:9} elements: {length}  peak memory: {peak / 1024 / 1024:.1f} MiB  seconds (traced): {elapsed:.2f}")
+
+    # Static estimate of the result size, for comparison with the cached peak
+    analysis = Parser().analyze(SOURCE)
+    print(f"analyze() elements: {analysis.length}  estimated result size: {analysis.memory_bytes / 1024 / 1024:.1f} MiB")
+
+if __name__ == "__main__":
+    main()
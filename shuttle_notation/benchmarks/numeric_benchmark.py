@@ -0,0 +1,37 @@
+# Compares the numeric backends of Parser on argument-heavy sequences.
+# Run with: python -m shuttle_notation.benchmarks.numeric_benchmark
+
+import random
+import time
+from decimal import Decimal
+from fractions import Fraction
+
+from shuttle_notation.parsing.full_parse import Parser
+
+def argument_heavy(rng: random.Random, sections: int) -> str:
+    parts = []
+    for _ in range(sections):
+        notes = " ".join(
+            rng.choice("abcdefg") + str(rng.randint(1, 7))
+            + ":amp0." + str(rng.randint(1, 9)) + ",sus*1." + str(rng.randint(0, 9))
+            + ",pan-0." + str(rng.randint(1, 9)) + ",lpf+" + str(rng.randint(100, 900))
+            for _ in range(8)
+        )
+        parts.append("(" + notes + "):0.25,sus1.5time,amp*0.8")
+    return " ".join(parts)
+
+def main():
+    rng = random.Random(0)
+    sources = [argument_heavy(rng, 50) for _ in range(20)]
+
+    print("backend   seconds")
+    for numeric in [Decimal, float, Fraction]:
+        parser = Parser(cache_size = 0, numeric = numeric)
+        parser.arg_defaults = {"sus": 1, "amp": 1, "time": 1}
+        start = time.perf_counter()
+        for source in sources:
+            parser.parse(source)
+        print(f"{numeric.__name__:9} {time.perf_counter() - start:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+# Previous implementations of the tree building, expansion and information parsing, kept to
+#   compare their speed in scanner_benchmark, and for the *_matches_old tests to check that the
+#   current ones give the same results.
+
+from decimal import Decimal
+from enum import Enum
+
+from shuttle_notation.parsing.cursor import Cursor
+from shuttle_notation.parsing.element import Element, ElementType
+from shuttle_notation.parsing.information_parsing import ElementInformation, DynamicArg, NO_ALIASES
+from shuttle_notation.parsing.util import duplicate, get_repeat
+
+# "Business logic" - explain later
+def section_split(source_string) -> list:
+    cursor = Cursor(source_string)
+
+    opened_parentheses = 0
+
+    everything = []
+
+    current = ""
+
+    while not cursor.is_done():
+        match cursor.get():
+            case "(":
+                current += cursor.get()
+                opened_parentheses += 1
+            case ")":
+                current += cursor.get()
+                opened_parentheses -= 1
+            case " ":
+                if opened_parentheses == 0:
+                    if current != "":
+                        everything.append(current)
+                    current = ""
+                else:
+                    current += cursor.get()
+            case _:
+                current += cursor.get()
+        cursor.next()
+
+    if current != "":
+        everything.append(current)
+
+    return everything
+
+def build_tree_old(source_string) -> Element:
+    
+    current_element = Element()
+    current_element.type = ElementType.SECTION 
+
+    def store(element):
+        if current_element.type == ElementType.ALTERNATION_SECTION:
+            current_alternation.append(element)
+        else:
+            current_element.elements.append(element)
+            element.parent = current_element
+
+    def end_current_alternation(alternation):
+
+        if len(alternation) > 1:
+            sub_section = current_element.add()
+            sub_section.type = ElementType.SECTION
+            
+            for ele in alternation:
+                ele.parent = sub_section
+                sub_section.elements.append(ele)
+        else:
+            # Looped to be 0-len safe, although typically one element 
+            for ele in alternation:
+                ele.parent = current_element
+                current_element.elements.append(ele)
+
+
+    # Divide into substrings, separated by space unless bracketed
+    # Dealing with one bracket-layer at a time 
+    current_alternation = []
+    for substring in section_split(source_string):
+
+        if "(" in substring or ")" in substring:
+
+            # Grab meta-information and then recursively parse bracketed sections 
+
+            if substring[0] != "(":
+                raise Exception("Malformed input - section does not start with '(' :" + substring)
+
+            # TODO: Suffix should be allowed to contain ")" - we should not look for the last index
+            #   but for the index of when all parentheses have been closed. 
+            end_index = substring.rfind(")")
+
+            if end_index == -1:
+                raise Exception("Malformed input - section does not have an ending ')': " + substring)
+
+            # Perform information gathering 
+            end_information = "".join(substring[end_index + 1:]) if substring[-1] != ")" else ""
+
+            unwrap = "".join(substring[1:end_index])
+
+            sub_section = build_tree_old(unwrap)
+            sub_section.information = end_information
+            store(sub_section)
+
+        elif substring == "/":
+
+            if current_element.type == ElementType.ALTERNATION_SECTION:
+
+                if len(current_alternation) == 0:
+                    raise Exception("Malformed input - possible duplicate '/':")
+
+                # Not the first encountered / 
+                # Take all elements created since the last /
+                # Add them as a section if multiple 
+                
+                end_current_alternation(current_alternation) 
+                current_alternation = []
+
+            elif len(current_element.elements) > 0: 
+                # Classify ongoing section as alternation
+                # Move any previously passed elements into a subsection (if plural)
+                current_element.type = ElementType.ALTERNATION_SECTION
+                current_alternation = []
+                
+                if len(current_element.elements) > 1:
+                    port = current_element.elements 
+                    sub_section = Element()
+                    sub_section.type = ElementType.SECTION
+                    sub_section.elements = port
+                    for e in sub_section.elements:
+                        e.parent = sub_section
+                    current_element.elements = [sub_section]
+                    
+            else:
+                raise Exception("Malformed input - '/' written before any other elements in section")
+        else:
+            # Regular, atomic entry 
+            atomic = Element() 
+            atomic.type = ElementType.ATOMIC
+            atomic.information = substring
+
+            store(atomic)
+
+    # In case last element is part of an alternation (post-/)
+    end_current_alternation(current_alternation)
+    current_alternation = []
+    
+    return current_element
+
+class TreeExpanderOld:
+
+    def __init__(self):
+        self.tick_list = []
+
+    # Count how many times one would have to use the element to fully expand it and its children.
+    def count_required_alternations(self, element):
+
+
+        # NOTE: Alternations require recursive counting in case they have nested alternations.
+        # Regular sections expand all-at-once and do not require multiple ticks.
+        if element.type == ElementType.ALTERNATION_SECTION:
+            # Max of [AC, 1]
+            return len(element.elements) * max([self.count_required_alternations(ele) for ele in element.elements] + [1])
+
+        return 1
+
+    def all_ticked(self, element) -> bool:
+        element_ticks = self.get_ticks(element)
+
+        required_ticks = self.count_required_alternations(element) \
+            if element.type == ElementType.ALTERNATION_SECTION \
+            else 1
+
+        children_ok = True
+        for child in element.elements:
+            if not self.all_ticked(child):
+                children_ok = False
+
+        ok = element_ticks >= required_ticks and children_ok
+        return ok
+
+    def tree_expand(self, element) -> list:
+
+        # NOTE: Workaround. Parsing correctly assumes top level to be an alternation if it contains "/", but recursive logic
+        #   expects top level to be a regular section.
+        top_section = Element()
+        top_section.type = ElementType.SECTION
+        top_section.elements = [element]
+
+        return self.expand(top_section, 1)
+
+    # Tick off an element, so that we can count how many times we have done so.
+    # Alternations must be used several times to fully expand, hence the need to count.
+    def tick(self,element):
+        self.tick_list.append(element)
+
+    # Returns how many times an element has been ticked so far.
+    # Does not account for children.
+    def get_ticks(self, element):
+        return len([e for e in self.tick_list if e is element])
+
+    # Expand both alternations and repeats
+    def expand(self, element, repeat) -> list:
+
+        #print("EXPANDING: ", element.decompile(), " ", element.type, len(element.elements))
+
+        if element.type == ElementType.ATOMIC:
+            self.tick(element)
+            return duplicate([element], repeat)
+        if element.type == ElementType.SECTION:
+
+            # Expand all children, including ticking self until all nested alternations are done
+            flatmap = []
+
+            while True:
+                self.tick(element)
+                matrix = [self.expand(e, get_repeat(e)) for e in element.elements]
+                for c in matrix:
+                    for r in c:
+                        flatmap.append(r)
+
+                # Check after ticking, to ensure that all children are always iterated at least once
+                if self.all_ticked(element):
+                    break
+
+            # Repeat the collected flatmap afterwards, to avoid duplicate ticks
+            return duplicate(flatmap, repeat)
+
+        if element.type == ElementType.ALTERNATION_SECTION:
+
+            # Repeat the alternation as required, grabbing the next alternation each time
+            full = []
+            for i in range(0, repeat):
+
+                # Tick element and return amount of times it has been ticked
+                ticks = self.get_ticks(element)
+                self.tick(element)
+                # Resolve an index from the tick amount (so that, in a 2-len array, 2 follows after 1, 0 after 2, etc)
+                mod = ticks % (len(element.elements))
+                current_alt = element.elements[mod]
+                full += self.expand(current_alt, get_repeat(current_alt))
+            return full
+
+        return []
+
+class InformationPart(Enum):
+    PREFIX = 0
+    INDEX = 1
+    SUFFIX = 2
+    REPETITION = 3
+    ARGS = 4
+
+def divide_information_old(element: Element) -> ElementInformation:
+
+    # Initiate with blank defaults
+    information = ElementInformation()
+
+    # Sections start at suffix; they have no prefix or index
+    current_part = InformationPart.SUFFIX \
+        if element.type in [ElementType.SECTION, ElementType.ALTERNATION_SECTION] \
+        else InformationPart.PREFIX
+
+    # Return blank when no information string is provided
+    if element.information == "":
+        return information
+
+    cursor = Cursor(element.information)
+
+    NUMBERS = "0123456789"
+
+    while True:
+        match current_part:
+            case InformationPart.PREFIX:
+
+                before_colon = element.information.split(":")[0]
+                smol_cursor = Cursor(before_colon)
+
+                if not smol_cursor.contains_any(NUMBERS):
+                    current_part = InformationPart.SUFFIX
+                    # NOTE: Implicit straight-to-suffix on no number
+                    # Below is the error we used to throw:
+                    #raise Exception("Malformed input - element information has no index: " + element.information)
+                else:
+
+                    until_number = cursor.get_until(NUMBERS)
+                    information.prefix = until_number
+
+                    # NOTE: Cursor weakness - if first character matches get_until we don't stop "before it"
+                    if cursor.get() not in NUMBERS:
+                        cursor.next()
+
+                    current_part = InformationPart.INDEX
+
+            case InformationPart.INDEX:
+                information.index_string = cursor.get_until("0123456789", False)
+
+                # NOTE: Again, cursor weakness
+                if cursor.get() in NUMBERS:
+                    cursor.next()
+
+                current_part = InformationPart.SUFFIX
+
+            case InformationPart.SUFFIX:
+
+                remaining = cursor.get_remaining()
+
+                star_index = remaining.find("*")
+                colon_index = remaining.find(":")
+
+                # Since * can appear inside args, we need to check for it before arg declaration
+                star_present = star_index != -1 and (star_index < colon_index or colon_index == -1)
+
+                if star_present:
+                    information.suffix = cursor.get_until("*")
+                    cursor.move_past_next("*")
+                    current_part = InformationPart.REPETITION
+                elif ":" in remaining:
+                    information.suffix = cursor.get_until(":")
+                    cursor.move_past_next(":")
+                    current_part = InformationPart.ARGS
+                else:
+                    information.suffix = remaining
+                    break
+
+            case InformationPart.REPETITION:
+                remaining = cursor.get_remaining()
+                if ":" in remaining:
+                    information.repetition = int(cursor.get_until(":"))
+                    cursor.move_past_next(":")
+                    current_part = InformationPart.ARGS
+                elif remaining != "":
+                    information.repetition = int(remaining)
+                    break
+
+            case InformationPart.ARGS:
+                if not cursor.is_done():
+                    information.arg_source = cursor.get_remaining()
+
+                break
+
+            case _:
+                # Shouldn't happen but w/e
+                break
+
+    return information
+
+def parse_args_old(arg_source, aliases: dict = NO_ALIASES, numeric: type = Decimal) -> dict:
+
+    args = {}
+
+    cursor = Cursor(arg_source)
+    while True:
+        # Step on separator at a time
+        content = cursor.get_until(",")
+
+        sub_cursor = Cursor(content)
+        # Numbers or operators break the key part
+        # TODO: Consider ".2" shorthand support
+        non_numeric = sub_cursor.get_until("0123456789+-*=")
+
+        # Step into the numeric part of the string unless it began immediately
+        if sub_cursor.peek() != "" and non_numeric != "":
+            sub_cursor.next()
+
+        value_part = sub_cursor.get_remaining()
+
+        if value_part != "":
+
+            actual_value = "".join(value_part[1:]) if value_part[0] in "+-*=" else value_part
+            sym = value_part[0] if value_part[0] in "+-*=" else ""
+
+            # Find letter arg reference suffix after numerical part
+            lil_cursor = Cursor(actual_value)
+            # TODO: I mean "get until not" would of course be more intuitive
+            # ... but we should replace this whole thing with regex eventually
+            num_value = lil_cursor.get_until("abcdefghijklmnopqrstuvxyz")
+            ref_part = ""
+            if lil_cursor.peek() != "" and num_value != "":
+                lil_cursor.next()
+                # As in: sus1.0relT -> relT
+                ref_part = lil_cursor.get_remaining()
+
+            numeric_value = numeric(num_value)
+
+            new_arg = DynamicArg(numeric_value, sym, ref_part)
+
+            if non_numeric == "":
+                if len(args) == 0:
+                    # TODO: Some other way to provide this default
+                    # First arg is "time" unless otherwise noted
+                    args["time"] = new_arg
+                else:
+                    raise Exception("Malformed input: unnamed non-first arg")
+            else:
+                # Apply alias
+                if non_numeric in aliases:
+                    non_numeric = aliases[non_numeric]
+
+                args[non_numeric] = new_arg
+
+        cursor.move_past_next(",")
+        if cursor.is_done():
+            break
+
+    return args
@@ -0,0 +1,45 @@
+# Compares Parser.parse_many() in-process against a process pool for growing batch sizes,
+#   to find the batch size where the pool starts to pay off (the min_batch default).
+# Run with: python -m shuttle_notation.benchmarks.parse_many_benchmark [workers]
+
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+from shuttle_notation.parsing.full_parse import Parser
+
+def track(rng: random.Random) -> str:
+    bars = []
+    for _ in range(8):
+        notes = " ".join(rng.choice("abcdefg") + str(rng.randint(1, 7)) + ":amp0." + str(rng.randint(1, 9)) for _ in range(6))
+        bars.append("(" + notes + " (c4 / d4 / e4:sus2))*2:0.25")
+    return " ".join(bars)
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+    rng = random.Random(0)
+    parser = Parser(cache_size = 0)
+    parser.arg_defaults = {"sus": Decimal("1.0"), "amp": Decimal("1.0")}
+
+    print("workers:", workers)
+    print("batch  in-process  pool")
+    crossover = None
+    for size in [10, 50, 100, 200, 500, 1000, 2000]:
+        sources = [track(rng) for _ in range(size)]
+        local = timed(lambda: parser.parse_many(sources, workers = 1))
+        pooled = timed(lambda: parser.parse_many(sources, workers = workers, min_batch = 0))
+        print(f"{size:5}  {local:10.3f}  {pooled:.3f}")
+        if crossover is None and pooled < local:
+            crossover = size
+
+    print("pool faster from batch size:", crossover)
+
+if __name__ == "__main__":
+    main()
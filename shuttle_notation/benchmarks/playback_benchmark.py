@@ -0,0 +1,45 @@
+# Timing accuracy of Scheduler on the real clock, against a naive sleep loop, with callbacks doing some work.
+# Run with: python -m shuttle_notation.benchmarks.playback_benchmark
+
+import asyncio
+import time
+
+from shuttle_notation.parsing.full_parse import Parser
+from shuttle_notation.parsing.playback import Scheduler
+
+SOURCE = "(c1:0.05 d2:0.05 (e3 / f4):0.1)*25"
+TEMPO = 60.0
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+async def naive(elements) -> float:
+    start = time.monotonic()
+    for element in elements:
+        busy(0.003)
+        await asyncio.sleep(float(element.args["time"]) * 60.0 / TEMPO)
+    return time.monotonic() - start
+
+async def scheduled(elements) -> tuple:
+    scheduler = Scheduler(elements, lambda element: busy(0.003), TEMPO)
+    start = time.monotonic()
+    await scheduler.run()
+    # The last element is emitted at its onset, the loop above also waits out its duration
+    return time.monotonic() - start + scheduler.duration(elements[-1]), scheduler.stats
+
+def main():
+    elements = Parser().parse(SOURCE)
+    expected = sum([float(e.args["time"]) for e in elements]) * 60.0 / TEMPO
+
+    naive_time = asyncio.run(naive(elements))
+    scheduled_time, stats = asyncio.run(scheduled(elements))
+
+    print(f"{len(elements)} elements, expected length {expected:.3f}s")
+    print(f"naive sleep loop: {naive_time:.3f}s (drift {naive_time - expected:+.3f}s)")
+    print(f"Scheduler:        {scheduled_time:.3f}s (drift {scheduled_time - expected:+.3f}s)")
+    print(f"Scheduler jitter: mean {stats.mean * 1000:.2f}ms, max {stats.max * 1000:.2f}ms, deviation {stats.deviation * 1000:.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+# Cost of Parser.profile, on the benchmark suite corpora.
+# With profiling off, parse() should be as fast as before instrumentation existed (compare against baseline.json).
+# Run with: python -m shuttle_notation.benchmarks.profiling_benchmark
+
+from shuttle_notation.benchmarks import corpora, suite
+
+def main():
+    parser = suite.make_parser()
+    sources = corpora.generate(0.5)
+
+    print(f"{'corpus':22}{'off':>10}{'on':>10}")
+    for name, source in sources.items():
+        parser.profile = False
+        off = suite.best_time(lambda: parser.parse(source), 5)
+        parser.profile = True
+        on = suite.best_time(lambda: parser.parse(source), 5)
+        print(f"{name:22}{off:10.4f}{on:10.4f}")
+
+    parser.profile = True
+    for source in sources.values():
+        parser.parse(source)
+    print()
+    print(parser.last_stats)
+
+if __name__ == "__main__":
+    main()
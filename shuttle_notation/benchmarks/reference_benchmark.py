@@ -0,0 +1,44 @@
+# Resolution of reference args, e.g. sus0.5time, per leaf and for long chains of references.
+# Run with: python -m shuttle_notation.benchmarks.reference_benchmark
+
+import time
+from decimal import Decimal
+from itertools import product
+
+from shuttle_notation.benchmarks import corpora
+import shuttle_notation.parsing.argument_resolution as argument_resolution
+import shuttle_notation.parsing.section_parsing as section_parsing
+from shuttle_notation.parsing.full_parse import Parser
+
+def best_of(repeats: int, function) -> float:
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# Source of a single element with a chain of the given length, each arg referencing the previous one
+def chain_source(length: int) -> str:
+    names = ["".join(letters) for letters in product("bcdefg", repeat = 5)][:length]
+    chain = [names[0] + "2time"] + [names[i] + "1" + names[i - 1] for i in range(1, length)]
+    return "a1:" + ",".join(reversed(chain))
+
+def main():
+    defaults = {"sus": Decimal("1.0"), "amp": Decimal("1.0"), "time": Decimal("0.5")}
+
+    source = corpora.reference_arguments(20000)
+    states = argument_resolution.leaf_states(section_parsing.build_tree(source), defaults)
+    finished = best_of(5, lambda: [argument_resolution.finish(state) for state in states.values()])
+    print(f"finish() of {len(states)} leaves: {finished:.3f}s")
+
+    parser = Parser(cache_size = 0)
+    parser.arg_defaults = defaults
+    for length in [100, 1000, 5000]:
+        chain = chain_source(length)
+        parsed = best_of(3, lambda: parser.parse(chain))
+        print(f"chain of {length} references: {parsed * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    main()
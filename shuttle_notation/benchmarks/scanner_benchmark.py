@@ -0,0 +1,40 @@
+# Scanner-based divide_information() and parse_args() against the previous Cursor-based versions.
+# Run with: python -m shuttle_notation.benchmarks.scanner_benchmark
+
+import time
+
+from shuttle_notation.benchmarks import corpora
+from shuttle_notation.parsing.element import Element, ElementType
+import shuttle_notation.parsing.information_parsing as information_parsing
+import shuttle_notation.benchmarks.old_implementations as old_implementations
+
+def timed(function, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        function(item)
+    return time.perf_counter() - start
+
+def main():
+    source = corpora.many_arguments(5000) + " " + corpora.reference_arguments(5000) + " " + corpora.long_flat(5000)
+
+    elements = []
+    for information in source.replace("(", " ").replace(")", " ").split(" "):
+        if information != "":
+            element = Element()
+            element.information = information
+            element.type = ElementType.ATOMIC
+            elements.append(element)
+    arg_sources = [information_parsing.divide_information(e).arg_source for e in elements]
+    arg_sources = [arg_source for arg_source in arg_sources if arg_source != ""]
+
+    print(f"{'function':20}{'old':>10}{'new':>10}{'speedup':>10}")
+    for name, old, new, items in [
+        ("divide_information", old_implementations.divide_information_old, information_parsing.divide_information, elements),
+        ("parse_args", old_implementations.parse_args_old, information_parsing.parse_args, arg_sources),
+    ]:
+        old_time = min([timed(old, items) for _ in range(3)])
+        new_time = min([timed(new, items) for _ in range(3)])
+        print(f"{name:20}{old_time:10.4f}{new_time:10.4f}{old_time / new_time:9.1f}x")
+
+if __name__ == "__main__":
+    main()
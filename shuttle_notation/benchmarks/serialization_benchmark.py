@@ -0,0 +1,35 @@
+# Loading parse results from the on-disk cache, against parsing them on startup.
+# Run with: python -m shuttle_notation.benchmarks.serialization_benchmark
+
+import random
+import tempfile
+import time
+
+from shuttle_notation.benchmarks.numeric_benchmark import argument_heavy
+from shuttle_notation.benchmarks.memory_benchmark import SOURCE as LARGE_SOURCE
+from shuttle_notation.parsing.full_parse import Parser
+
+def make_parser(directory: str) -> Parser:
+    parser = Parser(cache_directory = directory)
+    parser.arg_defaults = {"sus": 1, "amp": 1, "time": 1}
+    return parser
+
+def timed_parse(directory: str, sources: list[str]) -> tuple:
+    parser = make_parser(directory)
+    start = time.perf_counter()
+    results = [parser.parse(source) for source in sources]
+    return time.perf_counter() - start, results
+
+def main():
+    rng = random.Random(0)
+    library = [argument_heavy(rng, 5) + " (c1 / d2 / e3)*2" for _ in range(2000)]
+
+    for label, sources in [("library of 2000 sources", library), ("one 1M element source", [LARGE_SOURCE])]:
+        with tempfile.TemporaryDirectory() as directory:
+            parsed, expected = timed_parse(directory, sources)
+            loaded, results = timed_parse(directory, sources)
+            assert results == expected
+            print(f"{label}: parse and store {parsed:.3f}s, load {loaded:.3f}s ({parsed / loaded:.1f}x)")
+
+if __name__ == "__main__":
+    main()
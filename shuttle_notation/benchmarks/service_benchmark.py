@@ -0,0 +1,72 @@
+# Round-trip latency of parsing from another process: a new CLI process per request (cold),
+#   one long-running CLI process (warm) and the Unix socket server.
+# Run with: python -m shuttle_notation.benchmarks.service_benchmark
+
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+COMMAND = [sys.executable, "-m", "shuttle_notation", "--defaults", '{"time": 0.25, "sus": 1}']
+REQUEST = json.dumps("(c1:sus0.5 (d2 / e3 / f4))*4 g5:0.5") + "\n"
+
+def report(label: str, timings: list[float]):
+    timings = sorted(timings)
+    print(f"{label:14} median {statistics.median(timings) * 1000:8.2f}ms   p95 {timings[int(len(timings) * 0.95)] * 1000:8.2f}ms")
+
+def cold(requests: int) -> list[float]:
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        subprocess.run(COMMAND, input=REQUEST, capture_output=True, text=True, cwd=ROOT, check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def warm(requests: int) -> list[float]:
+    process = subprocess.Popen(COMMAND, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, cwd=ROOT)
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        process.stdin.write(REQUEST)
+        process.stdin.flush()
+        process.stdout.readline()
+        timings.append(time.perf_counter() - start)
+    process.stdin.close()
+    process.wait()
+    return timings
+
+def socket_round_trip(requests: int) -> list[float]:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "parser.sock")
+        server = subprocess.Popen(COMMAND + ["--socket", path], cwd=ROOT)
+        try:
+            while not os.path.exists(path):
+                time.sleep(0.01)
+
+            timings = []
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.connect(path)
+                stream = connection.makefile("rw")
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    stream.write(REQUEST)
+                    stream.flush()
+                    stream.readline()
+                    timings.append(time.perf_counter() - start)
+            return timings
+        finally:
+            server.terminate()
+            server.wait()
+
+def main():
+    report("cold CLI", cold(20))
+    report("warm CLI", warm(500))
+    report("socket", socket_round_trip(500))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Parsing a large notation file with parse_stream(), compared to reading it whole for parse().
+# Elements are only counted, so the peak memory is that of parsing rather than of keeping the result.
+# Run with: python -m shuttle_notation.benchmarks.stream_benchmark
+
+import os
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+
+from shuttle_notation.benchmarks import corpora
+from shuttle_notation.parsing.full_parse import Parser
+
+# Many sections with args. A top level alternation of three makes the top level take three passes.
+def large_source(sections: int, passes: int) -> str:
+    parts = ["(" + corpora.many_arguments(20) + ")*2:sus0.5time" for _ in range(sections)]
+    if passes > 1:
+        parts[0] = "(" + " / ".join(["a1"] * passes) + ")"
+    return " ".join(parts)
+
+# Times are taken without tracing, which slows down allocation
+def measure(parse) -> tuple:
+    start = time.perf_counter()
+    first = None
+    length = 0
+    for _ in parse():
+        if first is None:
+            first = time.perf_counter() - start
+        length += 1
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for _ in parse():
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return length, first, elapsed, peak
+
+def main():
+    parser = Parser(cache_size = 0)
+    parser.arg_defaults = {"time": Decimal("0.25")}
+
+    for passes in [1, 3]:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "large.shn")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(large_source(2000, passes))
+            print(f"source: {os.path.getsize(path) / 1024 / 1024:.1f} MiB, top level passes: {passes}")
+            compare(parser, path)
+
+def compare(parser: Parser, path: str):
+
+    def whole():
+        with open(path, encoding="utf-8") as file:
+            return parser.parse(file.read())
+
+    def streamed():
+        with open(path, encoding="utf-8") as file:
+            yield from parser.parse_stream(file)
+
+    for label, parse in [("parse()", whole), ("parse_stream()", streamed)]:
+        length, first, elapsed, peak = measure(parse)
+        print(f"  {label:15} elements: {length}  first after: {first:.3f}s  total: {elapsed:.2f}s  peak memory: {peak / 1024 / 1024:.1f} MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Times each parsing stage separately over the generated corpora, and compares against a stored baseline.
+
+import json
+import os
+import time
+from decimal import Decimal
+
+from shuttle_notation.benchmarks import corpora
+from shuttle_notation.parsing.full_parse import Parser
+import shuttle_notation.parsing.section_parsing as section_parsing
+import shuttle_notation.parsing.util as util
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Timings slower than baseline * tolerance are reported as regressions,
+#   unless within MINIMUM_DIFFERENCE seconds of it (too small to tell from noise)
+DEFAULT_TOLERANCE = 1.5
+MINIMUM_DIFFERENCE = 0.01
+
+CALIBRATION = "_calibration"
+
+# Best of several runs, to reduce noise from the rest of the system
+def best_time(function, repeats: int) -> float:
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# Fixed pure-Python workload, timed with every run so that baselines recorded on a faster or
+#   less loaded machine can be scaled before comparing
+def calibrate(repeats: int) -> float:
+    def workload():
+        total = 0
+        for i in range(200000):
+            total += i % 7
+        return total
+    return best_time(workload, repeats)
+
+def make_parser() -> Parser:
+    parser = Parser(cache_size = 0)
+    parser.arg_defaults = {"sus": Decimal("1.0"), "amp": Decimal("1.0"), "time": Decimal("1.0")}
+    return parser
+
+# Returns {corpus: {stage: seconds}}, plus the calibration time under CALIBRATION
+def run(scale: float = 1.0, repeats: int = 5) -> dict:
+    parser = make_parser()
+    results = {CALIBRATION: {"loop": calibrate(repeats)}}
+
+    for name, source in corpora.generate(scale).items():
+        # Each stage is timed on the output of the previous one, built outside the timing
+        tree = section_parsing.build_tree(source, parser.arg_aliases, parser.numeric)
+
+        results[name] = {
+            "build_tree": best_time(lambda: section_parsing.build_tree(source, parser.arg_aliases, parser.numeric), repeats),
+            "tree_expand": best_time(lambda: util.TreeExpander().tree_expand(tree), repeats),
+            "resolve": best_time(lambda: parser.resolve_all(tree), repeats),
+            "parse": best_time(lambda: parser.parse(source), repeats),
+        }
+
+    return results
+
+def save(results: dict, path: str):
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+def load(path: str) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+# Returns (corpus, stage, baseline seconds, current seconds) for each timing over tolerance
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[tuple]:
+    # How much slower this machine currently is than when the baseline was recorded
+    speed = 1.0
+    if CALIBRATION in results and CALIBRATION in baseline:
+        speed = results[CALIBRATION]["loop"] / baseline[CALIBRATION]["loop"]
+
+    regressions = []
+    for corpus, stages in results.items():
+        if corpus == CALIBRATION:
+            continue
+        for stage, seconds in stages.items():
+            expected = baseline.get(corpus, {}).get(stage)
+            expected = expected * speed if expected is not None else None
+            if expected is not None and seconds > expected * tolerance and seconds - expected > MINIMUM_DIFFERENCE:
+                regressions.append((corpus, stage, expected, seconds))
+    return regressions
+
+def report(results: dict, baseline: dict = None) -> str:
+    lines = [f"{'corpus':22}{'stage':13}{'seconds':>10}{'baseline':>10}"]
+    for corpus, stages in results.items():
+        for stage, seconds in stages.items():
+            expected = (baseline or {}).get(corpus, {}).get(stage)
+            baseline_text = f"{expected:10.4f}" if expected is not None else f"{'-':>10}"
+            lines.append(f"{corpus:22}{stage:13}{seconds:10.4f}{baseline_text}")
+    return "\n".join(lines)
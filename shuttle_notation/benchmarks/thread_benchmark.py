@@ -0,0 +1,38 @@
+# Throughput of one Parser shared by several threads, and of parse_parallel() on a source with many
+#   top level sections. Threads only run in parallel on free-threaded builds (e.g. python3.13t).
+# Run with: python -m shuttle_notation.benchmarks.thread_benchmark
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import time
+from decimal import Decimal
+
+from shuttle_notation.benchmarks import corpora
+from shuttle_notation.parsing.full_parse import Parser
+
+def main():
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}, {os.cpu_count()} CPUs")
+
+    parser = Parser(cache_size = 0)
+    parser.arg_defaults = {"sus": Decimal("1.0"), "amp": Decimal("1.0"), "time": Decimal("0.25")}
+    sources = [corpora.many_arguments(50) + " (a1 / b2)*" + str(i % 7 + 1) for i in range(400)]
+
+    single = None
+    for threads in [1, 2, 4, 8]:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(parser.parse, sources))
+        elapsed = time.perf_counter() - start
+        single = single or elapsed
+        print(f"{threads} threads: {len(sources) / elapsed:.0f} sources/s ({single / elapsed:.2f}x)")
+
+    source = " ".join("(" + corpora.huge_repetition(50) + ")" for _ in range(40))
+    for workers in [1, 4]:
+        start = time.perf_counter()
+        length = len(parser.parse_parallel(source, workers))
+        print(f"parse_parallel({workers} workers): {length} elements in {time.perf_counter() - start:.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+
+    Static analysis of an element tree: how often each leaf occurs in the expanded sequence,
+    computed from repeats and alternation cycles instead of by expansion.
+
+    Mirrors TreeExpander.expand():
+    - A section loops over its children until all nested alternations are fully ticked. Its first
+        expansion makes as many passes as its slowest alternation child needs; later ones make a single pass.
+    - An alternation picks its next child (ticks % children) once per repeat.
+    - Section repeats multiply the collected passes, without ticking anything again.
+
+    Every element is only expanded through its parent, so the state of a subtree depends only on
+    how many times it has been expanded, not on the order. This allows counting a whole subtree
+    at once, in time proportional to the tree size.
+    The same counts give the tick state of the expander after any amount of passes, see loop_sequence.py.
+
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+import struct
+import sys
+
+from shuttle_notation.parsing.element import Element, ElementType, ResolvedElement
+import shuttle_notation.parsing.util as util
+
+@dataclass
+class SequenceAnalysis:
+    length: int = 0 # Amount of elements in the expanded sequence
+    duration: Decimal = 0 # Sum of the resolved "time" arg, elements without one count as 0
+    memory_bytes: int = 0 # Estimated size of the list returned by Parser.parse(), see estimate_memory()
+
+# Amount of occurrences of each atomic element in the expanded sequence
+def count_leaves(top_element: Element) -> dict[Element, int]:
+
+    # Cycle lengths are the same ones that the expander uses
+    expander = util.TreeExpander()
+    top_section = Element()
+    top_section.type = ElementType.SECTION
+    top_section.elements = [top_element]
+    expander.count_required_alternations(top_section)
+
+    expansions = count_expansions(top_section, first_passes(top_section, expander), expander)
+
+    # Section repeats multiply the output of everything below them
+    counts = {}
+    stack = [(child, 1) for child in top_section.elements]
+    while stack:
+        element, multiplier = stack.pop()
+        repeat = max(util.get_repeat(element), 0)
+        match element.type:
+            case ElementType.ATOMIC:
+                counts[element] = expansions[element] * multiplier * repeat
+            case ElementType.SECTION:
+                stack.extend([(child, multiplier * repeat) for child in element.elements])
+            case ElementType.ALTERNATION_SECTION:
+                stack.extend([(child, multiplier) for child in element.elements])
+
+    return counts
+
+# Amount of times each element below a section is expanded, when the section makes
+#   the given amount of passes over its children. The expander must have prepared the section.
+def count_expansions(section: Element, passes: int, expander: util.TreeExpander) -> dict[Element, int]:
+
+    expansions = {}
+
+    # Each element is only reached through its parent, so it is visited once with its total expansions
+    stack = [(child, passes) for child in section.elements]
+    while stack:
+        element, count = stack.pop()
+        expansions[element] = count
+
+        match element.type:
+            case ElementType.SECTION:
+                # All children are expanded once per pass
+                child_passes = count + first_passes(element, expander) - 1 if count > 0 else 0
+                stack.extend([(child, child_passes) for child in element.elements])
+
+            case ElementType.ALTERNATION_SECTION:
+                repeat = util.get_repeat(element)
+                if repeat <= 0:
+                    raise Exception("Malformed input - alternation repeated 0 times never completes: " + element.information)
+
+                # Picks cycle through the children, starting from the first
+                cycles, remainder = divmod(count * repeat, len(element.elements))
+                for index, child in enumerate(element.elements):
+                    stack.append((child, cycles + (1 if index < remainder else 0)))
+
+    return expansions
+
+# Passes needed by the first expansion of a section, until its alternation children are fully ticked
+def first_passes(section: Element, expander: util.TreeExpander) -> int:
+    passes = 1
+    for child in section.elements:
+        if child.type == ElementType.ALTERNATION_SECTION:
+            repeat = util.get_repeat(child)
+            if repeat <= 0:
+                raise Exception("Malformed input - alternation repeated 0 times never completes: " + child.information)
+            passes = max(passes, -(-expander.count_required_alternations(child) // repeat))
+    return passes
+
+# Rough size of a parse result: the list itself and each distinct element and arg map in it.
+# Strings are interned and shared with the source, so they are not counted.
+def estimate_memory(length: int, resolved: dict[Element, ResolvedElement]) -> int:
+    size = sys.getsizeof([]) + length * struct.calcsize("P")
+
+    seen_args = set()
+    for element in resolved.values():
+        size += sys.getsizeof(element)
+        if id(element.args) not in seen_args:
+            seen_args.add(id(element.args))
+            size += sys.getsizeof(element.args) + sys.getsizeof(dict(element.args))
+            size += sum([sys.getsizeof(value) for value in element.args.values()])
+
+    return size
@@ -0,0 +1,206 @@
+"""
+
+    Top-down resolution of args for a whole element tree.
+
+    Each section folds its own args into the state handed down from its parent,
+    so that leaves only have to add their own args before finishing.
+    Produces the same values as util.resolve_full_arguments() does for a single leaf history.
+
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+import functools
+
+from shuttle_notation.parsing.element import Element, ElementType
+from shuttle_notation.parsing.information_parsing import DynamicArg
+import shuttle_notation.parsing.information_parsing as information_parsing
+
+# Raised for args that reference an arg that is never given a value
+class ArgReferenceError(Exception):
+    pass
+
+# Raised for args that reference each other in a loop, e.g. "a1b,b1a".
+# cycle holds the names along the loop, starting and ending with the same arg.
+class ReferenceCycleError(ArgReferenceError):
+    def __init__(self, cycle: list[str]):
+        self.cycle = cycle
+        super().__init__("Malformed input - circular arg references: " + " -> ".join(cycle))
+
+# An arg with all history from the defaults down to some element applied.
+# Treated as immutable, since states are shared between siblings.
+@dataclass(frozen=True, slots=True)
+class PartialArg:
+    value: Decimal # Folded value, or the multiplier of the reference if there is one
+    reference: str = "" # Arg whose final value should be multiplied by value
+    operations: tuple = () # (operator, value) pairs to apply after the reference is resolved
+    references: frozenset = frozenset() # All args referenced anywhere in the history
+    defaults: frozenset = frozenset() # Default args the folded value was derived from
+
+def apply_operator(operator: str, current, value):
+    match operator:
+        case "*":
+            return current * value
+        case "+":
+            return current + value
+        case "-":
+            return current * value
+        case _:
+            # Blank or unknown operator should overwrite
+            return value
+
+# Apply the next (lower) definition of an arg on top of what has been resolved so far
+def apply_arg(partial: PartialArg, arg: DynamicArg) -> PartialArg:
+
+    # Value should refer to another arg, see util.resolve_full_arguments()
+    if arg.other_arg_reference != "":
+        references = partial.references if partial is not None else frozenset()
+        return PartialArg(arg.value, arg.other_arg_reference, (), references | {arg.other_arg_reference})
+
+    # Introduce without any operators if no higher level version exists
+    # Note that a negation operator can also just mean a flat negative
+    if partial is None:
+        return PartialArg(arg.value * -1 if arg.operator == "-" else arg.value)
+
+    if partial.reference == "":
+        # Only operators keep the previous value, and with it any dependency on defaults
+        defaults = partial.defaults if arg.operator in ["*", "+", "-"] else frozenset()
+        return PartialArg(apply_operator(arg.operator, partial.value, arg.value), "", (), partial.references, defaults)
+
+    # Operators on a referencing arg have to wait for the reference to resolve
+    if arg.operator in ["*", "+", "-"]:
+        return PartialArg(partial.value, partial.reference, partial.operations + ((arg.operator, arg.value),), partial.references)
+
+    return PartialArg(arg.value, "", (), partial.references)
+
+# State of all args for the implied parent of the top element
+def initial_state(default_args: dict, numeric: type = Decimal) -> dict[str, PartialArg]:
+    return {name: PartialArg(numeric(default_args[name]), defaults=frozenset([name])) for name in default_args}
+
+# Fold the args of an element into the state of its parent.
+# Args of the element come first, followed by those only known to parents,
+#   matching the ordering of util.resolve_full_arguments().
+def apply_args(state: dict[str, PartialArg], args: dict[str, DynamicArg]) -> dict[str, PartialArg]:
+    if len(args) == 0:
+        return state
+
+    new_state = {}
+    for name in args:
+        new_state[name] = apply_arg(state.get(name), args[name])
+    for name in state:
+        if name not in new_state:
+            new_state[name] = state[name]
+    return new_state
+
+# Order in which args have to be resolved so that every arg comes after all args it references.
+# layout: (name, names referenced anywhere in its history) per arg.
+# Leaves mostly share a handful of layouts, so orders are computed once per layout.
+@functools.lru_cache(maxsize=1024)
+def resolution_order(layout: tuple) -> tuple:
+    references = dict(layout)
+
+    order = []
+    # 1 while on the current path of the search, 2 once ordered
+    marks = {}
+    for start in references:
+        if start in marks:
+            continue
+
+        # Depth first, ordering each arg once all of its references are ordered
+        marks[start] = 1
+        path = [start]
+        # Sorted so that errors name the same args on every run
+        pending = [iter(sorted(references[start]))]
+        while pending:
+            reference = next(pending[-1], None)
+            if reference is None:
+                pending.pop()
+                name = path.pop()
+                marks[name] = 2
+                order.append(name)
+            elif reference not in references:
+                raise ArgReferenceError("Malformed input - arg '" + path[-1] + "' references unknown arg '" + reference + "'")
+            elif marks.get(reference) == 1:
+                raise ReferenceCycleError(path[path.index(reference):] + [reference])
+            elif reference not in marks:
+                marks[reference] = 1
+                path.append(reference)
+                pending.append(iter(sorted(references[reference])))
+
+    return tuple(order)
+
+# Resolve the final values of a leaf state
+def finish(state: dict[str, PartialArg]) -> dict[str, Decimal]:
+
+    resolved_args: dict[str, Decimal] = {}
+
+    for name in resolution_order(tuple([(name, state[name].references) for name in state])):
+        partial = state[name]
+        if partial.reference == "":
+            resolved_args[name] = partial.value
+        else:
+            value = partial.value * resolved_args[partial.reference]
+            for operator, operand in partial.operations:
+                value = apply_operator(operator, value, operand)
+            resolved_args[name] = value
+
+    return resolved_args
+
+# Key of a state for telling whether it resolves the same way as another.
+# Values are kept as written, since e.g. Decimal("1.0") and Decimal("1") compare equal but resolve differently.
+def state_key(state: dict[str, PartialArg]) -> tuple:
+    return tuple([
+        (name, partial.reference, str(partial.value), tuple([(operator, str(operand)) for operator, operand in partial.operations]))
+        for name, partial in state.items()
+    ])
+
+# Names of the default args that the finished values of a leaf state depend on,
+#   directly or through references
+def dependencies(state: dict[str, PartialArg]) -> frozenset:
+    found = set()
+    seen = set()
+    stack = list(state)
+    while stack:
+        name = stack.pop()
+        if name in seen or name not in state:
+            continue
+        seen.add(name)
+        found.update(state[name].defaults)
+        stack.extend(state[name].references)
+    return frozenset(found)
+
+# Fold the args of every atomic element in the tree, in a single top-down pass.
+# Returns the unfinished leaf states keyed by element. Args are looked up with get_args,
+#   which can be replaced to e.g. apply aliases to args parsed without them.
+def leaf_states(
+    top_element: Element,
+    default_args: dict,
+    numeric: type = Decimal,
+    get_args = information_parsing.get_args
+) -> dict[Element, dict[str, PartialArg]]:
+
+    leaves = {}
+
+    top_state = apply_args(initial_state(default_args, numeric), get_args(top_element))
+    if top_element.type == ElementType.ATOMIC:
+        leaves[top_element] = top_state
+        return leaves
+
+    states = {top_element: top_state}
+    stack = [top_element]
+    while stack:
+        section = stack.pop()
+        state = states.pop(section)
+        for child in section.elements:
+            child_state = apply_args(state, get_args(child))
+            if child.type == ElementType.ATOMIC:
+                leaves[child] = child_state
+            else:
+                states[child] = child_state
+                stack.append(child)
+
+    return leaves
+
+# Resolve the args of every atomic element in the tree, keyed by element
+def resolve_tree(top_element: Element, default_args: dict, numeric: type = Decimal) -> dict[Element, dict[str, Decimal]]:
+    return {leaf: finish(state) for leaf, state in leaf_states(top_element, default_args, numeric).items()}
@@ -0,0 +1,71 @@
+"""
+
+    Process-pool helpers for Parser.parse_many().
+
+    Results travel between processes in a packed form: each distinct resolved element is sent
+    once, and the sequence itself is an array of row ids.
+
+"""
+
+from array import array
+from decimal import Decimal
+
+from shuttle_notation.parsing.element import ResolvedElement, ArgInterner
+
+# Parser of the current worker process, configured once by init_worker()
+worker_parser = None
+
+def init_worker(aliases: dict, defaults: dict, numeric: type):
+    global worker_parser
+    from shuttle_notation.parsing.full_parse import Parser
+    worker_parser = Parser(numeric = numeric)
+    worker_parser.arg_aliases = aliases
+    worker_parser.arg_defaults = defaults
+
+def parse_packed(source_string: str) -> tuple:
+    return pack(worker_parser.parse_uncached(source_string))
+
+# Pack a parse result into (layouts, rows, sequence):
+#   layouts: tuples of arg names, shared by rows with the same args
+#   rows: (prefix, index, suffix, layout id, arg values as strings) per distinct element
+#   (str() round-trips exactly for Decimal, float and Fraction)
+#   sequence: row id of each element, in order
+def pack(elements: list[ResolvedElement]) -> tuple:
+    layouts = {}
+    rows = {}
+    row_list = []
+    sequence = array("I")
+
+    for element in elements:
+        row_id = rows.get(id(element))
+        if row_id is None:
+            names = tuple(element.args)
+            layout_id = layouts.setdefault(names, len(layouts))
+            row_id = len(row_list)
+            rows[id(element)] = row_id
+            row_list.append((
+                element.prefix,
+                element.index,
+                element.suffix,
+                layout_id,
+                tuple(str(element.args[name]) for name in names)
+            ))
+        sequence.append(row_id)
+
+    return list(layouts), row_list, sequence
+
+def unpack(packed: tuple, numeric: type = Decimal) -> list[ResolvedElement]:
+    layouts, rows, sequence = packed
+
+    # Elements repeat in the sequence as they do in a local parse
+    interner = ArgInterner()
+    distinct = [
+        ResolvedElement(
+            interner.string(prefix),
+            index,
+            interner.string(suffix),
+            interner.args({name: numeric(value) for name, value in zip(layouts[layout_id], values)})
+        )
+        for prefix, index, suffix, layout_id, values in rows
+    ]
+    return [distinct[row_id] for row_id in sequence]
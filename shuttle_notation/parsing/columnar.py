@@ -0,0 +1,96 @@
+"""
+
+    Columnar (struct-of-arrays) form of a parsed sequence, for bulk operations on whole columns.
+
+"""
+
+from array import array
+from decimal import Decimal
+
+from shuttle_notation.parsing.element import ResolvedElement, ArgInterner
+
+class ColumnarSequence:
+
+    def __init__(self, numeric: type = Decimal):
+        self.numeric = numeric
+        self.index = array("q")
+
+        # Interned strings: the id columns index into the tables
+        self.prefix_ids = array("I")
+        self.prefixes: list[str] = []
+        self.suffix_ids = array("I")
+        self.suffixes: list[str] = []
+
+        # Arg names of each element in their original order, for converting back
+        self.layout_ids = array("I")
+        self.layouts: list[tuple] = []
+
+        # One column per arg name. Float values are stored in array("d"), other numeric types in lists.
+        # Positions where an element lacks the arg hold 0 and are marked 0 in the presence mask.
+        self.columns: dict[str, list] = {}
+        self.present: dict[str, bytearray] = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    # Values of an arg, with None where an element lacks it
+    def column(self, name: str) -> list:
+        return [value if present else None for value, present in zip(self.columns[name], self.present[name])]
+
+    @classmethod
+    def from_elements(cls, elements: list[ResolvedElement], numeric: type = Decimal):
+        sequence = cls(numeric)
+
+        prefix_table = {}
+        suffix_table = {}
+        layout_table = {}
+
+        # Elements repeat in parse results, so rows are computed once per distinct object
+        rows = {}
+        row_ids = []
+        for element in elements:
+            row = rows.get(id(element))
+            if row is None:
+                names = tuple(element.args)
+                row = (
+                    prefix_table.setdefault(element.prefix, len(prefix_table)),
+                    suffix_table.setdefault(element.suffix, len(suffix_table)),
+                    layout_table.setdefault(names, len(layout_table)),
+                    element
+                )
+                rows[id(element)] = row
+            row_ids.append(row)
+
+        sequence.index = array("q", [row[3].index for row in row_ids])
+        sequence.prefix_ids = array("I", [row[0] for row in row_ids])
+        sequence.suffix_ids = array("I", [row[1] for row in row_ids])
+        sequence.layout_ids = array("I", [row[2] for row in row_ids])
+        sequence.prefixes = list(prefix_table)
+        sequence.suffixes = list(suffix_table)
+        sequence.layouts = list(layout_table)
+
+        names = {}
+        for layout in sequence.layouts:
+            for name in layout:
+                names[name] = None
+
+        zero = numeric(0)
+        for name in names:
+            values = [row[3].args.get(name, zero) for row in row_ids]
+            sequence.columns[name] = array("d", values) if numeric is float else values
+            sequence.present[name] = bytearray([name in row[3].args for row in row_ids])
+
+        return sequence
+
+    def to_elements(self) -> list[ResolvedElement]:
+        interner = ArgInterner()
+        elements = []
+        for position in range(len(self.index)):
+            layout = self.layouts[self.layout_ids[position]]
+            elements.append(ResolvedElement(
+                self.prefixes[self.prefix_ids[position]],
+                self.index[position],
+                self.suffixes[self.suffix_ids[position]],
+                interner.args({name: self.columns[name][position] for name in layout})
+            ))
+        return elements
@@ -0,0 +1,129 @@
+"""
+
+    Compiled sequences: the tree, expansion order and parsed args of a source, kept so that
+    it can be resolved again under other defaults and aliases without parsing or expanding.
+
+"""
+
+from shuttle_notation.parsing.element import Element, ElementType, ResolvedElement, ArgInterner
+import shuttle_notation.parsing.argument_resolution as argument_resolution
+import shuttle_notation.parsing.information_parsing as information_parsing
+
+class CompiledSequence:
+
+    # Args are expected to be parsed without aliases, which are instead applied in resolve().
+    # make_resolved(element, args, interner) creates the final elements, see Parser.make_resolved().
+    def __init__(self, top_element: Element, sequence: list[Element], numeric: type,
+                 default_args: dict, arg_aliases: dict, make_resolved):
+        self.tree = top_element
+        self.sequence = sequence # Atomic elements in expanded order
+        self.numeric = numeric
+        self.make_resolved = make_resolved
+
+        # Used by resolve() when not given others
+        self.default_args = dict(default_args)
+        self.arg_aliases = dict(arg_aliases)
+
+        # Elements with args on the path from the top down to each leaf, including the leaf
+        self.histories: dict[Element, tuple] = {}
+        self.find_histories()
+
+        # State of the last resolve(), for re-resolving only what changed
+        self.resolved_defaults: dict = None
+        self.resolved_aliases: dict = None
+        self.element_args: dict[Element, dict] = {}
+        self.resolved: dict[Element, ResolvedElement] = {}
+        self.dependents: dict[str, list[Element]] = {} # Leaves depending on each default
+        self.interner = ArgInterner()
+
+    def __len__(self):
+        return len(self.sequence)
+
+    def find_histories(self):
+        def step(history, element):
+            return history + (element,) if information_parsing.get_args(element) else history
+
+        if self.tree.type == ElementType.ATOMIC:
+            self.histories[self.tree] = step((), self.tree)
+            return
+
+        stack = [(self.tree, step((), self.tree))]
+        while stack:
+            section, history = stack.pop()
+            for child in section.elements:
+                if child.type == ElementType.ATOMIC:
+                    self.histories[child] = step(history, child)
+                else:
+                    stack.append((child, step(history, child)))
+
+    # Resolve all elements under the given defaults and aliases, or those given when compiling.
+    # When only default values have changed since the last call, only the leaves depending on them are resolved again.
+    # If resolving fails (e.g. ArgReferenceError), the state of the last successful call is kept.
+    def resolve(self, defaults: dict = None, aliases: dict = None) -> list[ResolvedElement]:
+        defaults = self.default_args if defaults is None else defaults
+        aliases = self.arg_aliases if aliases is None else aliases
+
+        # Adding or removing a default changes how args are introduced, so only values can be compared
+        if self.resolved_defaults is None or aliases != self.resolved_aliases \
+                or list(defaults) != list(self.resolved_defaults):
+            self.resolve_all(defaults, aliases)
+        else:
+            changed = [
+                name for name in defaults
+                if str(self.numeric(defaults[name])) != str(self.numeric(self.resolved_defaults[name]))
+            ]
+            self.resolve_changed(defaults, changed)
+
+        self.resolved_defaults = dict(defaults)
+        return [self.resolved[e] for e in self.sequence]
+
+    def resolve_all(self, defaults: dict, aliases: dict):
+        # Built up on the side, and only stored once every leaf has resolved
+        element_args = {}
+        resolved = {}
+        dependents = {}
+        interner = ArgInterner()
+
+        def get_args(element):
+            args = element_args.get(element)
+            if args is None:
+                args = alias_args(element, aliases, self.numeric)
+                element_args[element] = args
+            return args
+
+        states = argument_resolution.leaf_states(self.tree, defaults, self.numeric, get_args)
+        for leaf, state in states.items():
+            resolved[leaf] = self.make_resolved(leaf, argument_resolution.finish(state), interner)
+            for name in argument_resolution.dependencies(state):
+                dependents.setdefault(name, []).append(leaf)
+
+        self.resolved_aliases = dict(aliases)
+        self.element_args = element_args
+        self.resolved = resolved
+        self.dependents = dependents
+        self.interner = interner
+
+    # Resolve the leaves depending on the changed defaults from their histories
+    def resolve_changed(self, defaults: dict, changed: list[str]):
+        affected = {}
+        for name in changed:
+            for leaf in self.dependents.get(name, []):
+                affected[leaf] = None
+
+        initial = argument_resolution.initial_state(defaults, self.numeric)
+        updated = {}
+        for leaf in affected:
+            state = initial
+            for element in self.histories[leaf]:
+                state = argument_resolution.apply_args(state, self.element_args[element])
+            updated[leaf] = self.make_resolved(leaf, argument_resolution.finish(state), self.interner)
+        self.resolved.update(updated)
+
+# Args of the element as information_parsing.parse_args() gives them with the given aliases.
+# Args mentioning an alias are parsed again, since an alias can merge with an arg of the
+#   name it stands for, and which of them wins depends on the order in the source.
+def alias_args(element: Element, aliases: dict, numeric: type) -> dict:
+    args = information_parsing.get_args(element)
+    if not any(name in aliases for name in args):
+        return args
+    return information_parsing.parse_args(information_parsing.get_information(element).arg_source, aliases, numeric)
@@ -1,30 +1,70 @@
 from enum import Enum
 from dataclasses import dataclass
+import sys
 
 class ElementType(Enum):
     SECTION = 0
     ALTERNATION_SECTION = 1
     ATOMIC = 2
 
-# Atomic element after all parsing complete
-@dataclass
+# Read-only dict of resolved args, so that one map can be shared between elements and results.
+# Unlike types.MappingProxyType, it can be pickled and copied along with the elements holding it.
+class ArgMap(dict):
+    __slots__ = ()
+
+    def read_only(self, *args, **kwargs):
+        raise TypeError("'ArgMap' object is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = read_only
+    clear = pop = popitem = setdefault = update = read_only
+
+    # Rebuilt from a plain dict, since unpickling would otherwise fill it through __setitem__
+    def __reduce__(self):
+        return (ArgMap, (dict(self),))
+
+# Atomic element after all parsing complete.
+# Immutable, so that identical elements can be shared within and between results.
+@dataclass(frozen=True, slots=True)
 class ResolvedElement:
     prefix: str
     index: int
     suffix: str
-    args: dict     
+    args: ArgMap # See ArgInterner
 
     def to_str(self) -> str:
         arg_str = "" if len(self.args) == 0 else ":"
         arg_str += ",".join([key + str(self.args[key]) for key in self.args])
         return self.prefix + str(self.index) + self.suffix + arg_str
 
+# Flyweight store for the strings and arg maps of resolved elements.
+# Neighbouring elements usually resolve to identical args, which are then shared as one read-only map.
+class ArgInterner:
+    def __init__(self):
+        self.arg_maps = {}
+
+    def args(self, args: dict) -> ArgMap:
+        # str() keeps e.g. Decimal("1.0") and Decimal("1.00") apart, which compare equal
+        key = tuple([(name, str(args[name])) for name in args])
+        shared = self.arg_maps.get(key)
+        if shared is None:
+            shared = ArgMap(args)
+            self.arg_maps[key] = shared
+        return shared
+
+    def string(self, string: str) -> str:
+        return sys.intern(string)
+
 class Element:
+    __slots__ = ("elements", "information", "type", "parent", "info", "args")
+
     def __init__(self):
         self.elements = []
         self.information = ""
         self.type = ElementType.ATOMIC
         self.parent = None
+        # Parsed once from self.information, see information_parsing.parse_element()
+        self.info = None # ElementInformation
+        self.args = None # dict[str, DynamicArg]
 
     def add(self):
         self.elements.append(Element())
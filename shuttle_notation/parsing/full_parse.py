@@ -1,41 +1,409 @@
 import shuttle_notation.parsing.information_parsing as information_parsing
 import shuttle_notation.parsing.section_parsing as section_parsing
-from shuttle_notation.parsing.element import Element, ElementType, ResolvedElement
+from shuttle_notation.parsing.element import Element, ElementType, ResolvedElement, ArgInterner
 import shuttle_notation.parsing.util as util
+import shuttle_notation.parsing.argument_resolution as argument_resolution
+from shuttle_notation.parsing.sequence_view import SequenceView
+from shuttle_notation.parsing.incremental import IncrementalResult
+import shuttle_notation.parsing.incremental as incremental
+import shuttle_notation.parsing.batch as batch
+from shuttle_notation.parsing.columnar import ColumnarSequence
+from shuttle_notation.parsing.profiling import ParseStats
+from shuttle_notation.parsing.analysis import SequenceAnalysis
+import shuttle_notation.parsing.analysis as analysis
+from shuttle_notation.parsing.compiled import CompiledSequence
+from shuttle_notation.parsing.timed_sequence import TimedSequence
+from shuttle_notation.parsing.loop_sequence import LoopSequence
+import shuttle_notation.parsing.loop_sequence as loop_sequence
+from shuttle_notation.parsing.serialization import DiskCache
+import shuttle_notation.parsing.profiling as profiling
+import shuttle_notation.parsing.streaming as streaming
  
-from dataclasses import dataclass
+from collections import OrderedDict
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+import threading
+import time
+from dataclasses import dataclass, field
 from decimal import Decimal
+from types import MappingProxyType
 
+@dataclass
+class CacheInfo:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+    max_size: int = 0
+
+# Settings of a Parser at one point in time, see Parser.config()
+@dataclass(frozen=True)
+class ParserConfig:
+    arg_aliases: tuple = () # (alias, name) pairs
+    arg_defaults: tuple = field(default=(), compare=False) # (name, value) pairs, compared by defaults_key
+    numeric: type = Decimal
+
+    # Read-only dicts of the pairs above, as taken by the parsing functions
+    aliases: MappingProxyType = field(init=False, repr=False, compare=False)
+    defaults: MappingProxyType = field(init=False, repr=False, compare=False)
+
+    # (name, type, str(value)) for each default. Values that compare equal, e.g. Decimal("1.0")
+    #   and Decimal("1"), can still resolve differently (see ArgInterner).
+    defaults_key: tuple = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Frozen fields can only be set through object
+        object.__setattr__(self, "aliases", MappingProxyType(dict(self.arg_aliases)))
+        object.__setattr__(self, "defaults", MappingProxyType(dict(self.arg_defaults)))
+        object.__setattr__(self, "defaults_key", tuple([(name, type(value), str(value)) for name, value in self.arg_defaults]))
+
+# Spaces only separate elements, so any run of them means the same thing
+def normalize_source(source_string: str) -> str:
+    return " ".join([part for part in source_string.split(" ") if part != ""])
+
+# Parsers can be shared between threads. Each call works from a snapshot of the configuration
+#   taken when it starts, and keeps all other state to itself; only the caches are shared, under a lock.
 class Parser:
-    def __init__(self):
+    def __init__(self, cache_size: int = 128, numeric: type = Decimal, cache_directory: str = None):
         # provided as alias:realname
         self.arg_aliases = {}
         self.arg_defaults = {}
 
+        # Type of all arg values: Decimal for exactness, float for speed, or fractions.Fraction.
+        # Constructed from the written value strings and from the values of arg_defaults.
+        self.numeric = numeric
+
+        # Results of parse(), least recently used first. A size of 0 disables caching.
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.cache_stats = CacheInfo()
+        self.cache_lock = threading.Lock()
+
+        # Binary files of parse() results, kept between runs (see serialization.py).
+        # Consulted on misses of the in-memory cache.
+        self.disk_cache = DiskCache(cache_directory) if cache_directory is not None else None
+
+        # Instrumentation of parse(), off by default. When on, the ParseStats of each call
+        #   are kept in last_stats and passed to on_stats, if set. With several threads,
+        #   last_stats is that of whichever call finished last.
+        self.profile = False
+        self.on_stats = None
+        self.last_stats: ParseStats = None
+
+    # Snapshot of the configuration, unaffected by later changes to arg_aliases, arg_defaults or numeric
+    def config(self) -> ParserConfig:
+        return ParserConfig(tuple(self.arg_aliases.items()), tuple(self.arg_defaults.items()), self.numeric)
+
+    def cache_info(self) -> CacheInfo:
+        with self.cache_lock:
+            return CacheInfo(
+                self.cache_stats.hits,
+                self.cache_stats.misses,
+                self.cache_stats.evictions,
+                len(self.cache),
+                self.cache_size
+            )
+
+    def clear_cache(self):
+        with self.cache_lock:
+            self.cache.clear()
+            self.cache_stats = CacheInfo()
+
     def parse(self, source_string: str) -> list[ResolvedElement]:
+        if not self.profile:
+            return self.parse_cached(source_string, self.config())
+
+        stats = ParseStats()
+        profiling.state.current = stats
+        start = time.perf_counter()
+        try:
+            result = self.parse_cached(source_string, self.config())
+        finally:
+            profiling.state.current = None
+        stats.total_seconds = time.perf_counter() - start
+
+        self.last_stats = stats
+        if self.on_stats is not None:
+            self.on_stats(stats)
+        return result
+
+    def parse_cached(self, source_string: str, config: ParserConfig) -> list[ResolvedElement]:
+        if self.cache_size <= 0 and self.disk_cache is None:
+            return self.parse_uncached(source_string, config)
+
+        # Configuration is part of the key, so that changes to the dicts are never served stale results
+        key = (normalize_source(source_string), config.arg_aliases, config.defaults_key, config.numeric)
+
+        with self.cache_lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache_stats.hits += 1
+                self.cache.move_to_end(key)
+            else:
+                self.cache_stats.misses += 1
+
+        if cached is not None:
+            stats = profiling.state.current
+            if stats is not None:
+                stats.cache_hits += 1
+            # Elements are immutable and can be shared; only the list is copied
+            return list(cached)
+
+        # Parsed outside of the lock, so that other sources are not held up.
+        # Threads missing the same source at once each parse it.
+        result = self.parse_disk_cached(key, source_string, config)
+        if self.cache_size > 0:
+            with self.cache_lock:
+                self.cache[key] = result
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+                    self.cache_stats.evictions += 1
+            return list(result)
+        return result
+
+    def parse_disk_cached(self, key: tuple, source_string: str, config: ParserConfig) -> list[ResolvedElement]:
+        if self.disk_cache is None or not self.disk_cache.supports(config.numeric):
+            return self.parse_uncached(source_string, config)
+
+        result = self.disk_cache.load(key)
+        if result is None:
+            result = self.parse_uncached(source_string, config)
+            self.disk_cache.store(key, result, config.numeric)
+        return result
+
+    # Parse several sources, spread over a pool of worker processes.
+    # Batches smaller than min_batch are parsed in-process, where pool startup would cost more than it saves
+    #   (see benchmarks/parse_many_benchmark.py).
+    def parse_many(self, sources: list[str], workers: int = None, min_batch: int = 200) -> list[list[ResolvedElement]]:
+        sources = list(sources)
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(sources) < min_batch:
+            return [self.parse(source) for source in sources]
+
+        # Configuration is sent once per worker rather than with each source
+        config = self.config()
+        with ProcessPoolExecutor(
+            workers,
+            initializer=batch.init_worker,
+            initargs=(dict(config.aliases), dict(config.defaults), config.numeric)
+        ) as pool:
+            chunk_size = max(1, len(sources) // (4 * workers))
+            return [batch.unpack(packed, config.numeric) for packed in pool.map(batch.parse_packed, sources, chunksize=chunk_size)]
+
+    def parse_uncached(self, source_string: str, config: ParserConfig = None) -> list[ResolvedElement]:
+        config = config or self.config()
+        stats = profiling.state.current
+        if stats is not None:
+            return self.parse_profiled(source_string, stats, config)
+
         # Run the whole intended sequence of parsing, from source to final elements 
-        top_element = section_parsing.build_tree(source_string)
+        top_element = section_parsing.build_tree(source_string, config.aliases, config.numeric)
         tree = util.TreeExpander() 
         sequence = tree.tree_expand(top_element)
-        return [self.resolve(e) for e in sequence]
 
-    def resolve(self, element: Element) -> ResolvedElement:
-        
+        # Repeated and alternated elements are the same object, so each is only resolved once
+        resolved = self.resolve_all(top_element, config)
+        return [resolved[e] for e in sequence]
+
+    # parse_uncached(), recording the time of each stage into stats
+    def parse_profiled(self, source_string: str, stats: ParseStats, config: ParserConfig) -> list[ResolvedElement]:
+        start = time.perf_counter()
+        top_element = section_parsing.build_tree(source_string, config.aliases, config.numeric)
+        stats.build_seconds = time.perf_counter() - start
+        stats.nodes_built = profiling.count_nodes(top_element)
+
+        start = time.perf_counter()
+        tree = util.TreeExpander()
+        sequence = tree.tree_expand(top_element)
+        stats.expand_seconds = time.perf_counter() - start
+        stats.ticks = sum(tree.ticks.values())
+
+        start = time.perf_counter()
+        resolved = self.resolve_all(top_element, config)
+        result = [resolved[e] for e in sequence]
+        stats.resolve_seconds = time.perf_counter() - start
+        stats.leaves_resolved = len(resolved)
+        return result
+
+    # parse() with the top level elements expanded on a pool of threads, see loop_sequence.split_expand().
+    # Only faster on Python builds without the GIL (sys._is_gil_enabled()); elsewhere the threads take turns.
+    def parse_parallel(self, source_string: str, workers: int = None) -> list[ResolvedElement]:
+        config = self.config()
+        workers = workers or os.cpu_count() or 1
+        top_element = section_parsing.build_tree(source_string, config.aliases, config.numeric)
+        resolved = self.resolve_all(top_element, config)
+        if workers == 1:
+            sequence = util.TreeExpander().tree_expand(top_element)
+        else:
+            with ThreadPoolExecutor(workers) as pool:
+                sequence = loop_sequence.split_expand(top_element, workers, pool.map)
+        return [resolved[e] for e in sequence]
+
+    # Lazy version of parse(), yielding resolved elements one at a time.
+    # Only the tree is built and resolved up front; expansion happens as elements are requested.
+    def iter_parse(self, source_string: str):
+        config = self.config()
+        top_element = section_parsing.build_tree(source_string, config.aliases, config.numeric)
+        resolved = self.resolve_all(top_element, config)
+        for element in util.TreeExpander().iter_expand(top_element):
+            yield resolved[element]
+
+    # Lazy version of parse() for sources in text file objects, read chunk_size characters at a time.
+    # Elements are yielded as soon as the top level elements they come from are complete, so memory is
+    #   bounded by the chunk size or the largest top level element, not the source (see streaming.py).
+    # If the top level needs more than one pass, the source is read again for each.
+    # A top level "/" makes the whole source one alternation, which is parsed in full once found.
+    def parse_stream(self, fileobj, chunk_size: int = 65536):
+        config = self.config()
+        source = streaming.ReplayableSource(fileobj, chunk_size)
+        try:
+            passes = 1
+            yielded = 0
+            for run in streaming.split_top_level(source.chunks()):
+                top_element = None
+                if not streaming.starts_with_alternation(run):
+                    top_element = section_parsing.build_tree(run, config.aliases, config.numeric)
+
+                if top_element is None or top_element.type != ElementType.SECTION:
+                    # What was yielded so far is the start of the first alternative, as it is first expanded
+                    top_element = section_parsing.build_tree("".join(source.replay()), config.aliases, config.numeric)
+                    resolved = self.resolve_all(top_element, config)
+                    full = util.TreeExpander().iter_expand(top_element)
+                    yield from (resolved[element] for element in islice(full, yielded, None))
+                    return
+
+                loop = LoopSequence(top_element, self.resolve_all(top_element, config))
+                passes = max(passes, loop.cycle_length)
+                for element in loop.iteration(0):
+                    yielded += 1
+                    yield element
+
+            for index in range(1, passes):
+                for run in streaming.split_top_level(source.replay()):
+                    top_element = section_parsing.build_tree(run, config.aliases, config.numeric)
+                    yield from LoopSequence(top_element, self.resolve_all(top_element, config)).iteration(index)
+        finally:
+            source.close()
+
+    # Random-access version of parse(), supporting len(), indexing and slicing
+    #   without expanding the full sequence.
+    def parse_view(self, source_string: str) -> SequenceView:
+        config = self.config()
+        top_element = section_parsing.build_tree(source_string, config.aliases, config.numeric)
+        block = util.TreeExpander().block_expand(top_element)
+        return SequenceView(block, self.resolve_all(top_element, config))
+
+    # Columnar version of parse(), see ColumnarSequence
+    def parse_columnar(self, source_string: str) -> ColumnarSequence:
+        config = self.config()
+        return ColumnarSequence.from_elements(self.parse_uncached(source_string, config), config.numeric)
+
+    # Length, total duration and estimated memory use of what parse() would return,
+    #   computed from the tree without expanding it
+    def analyze(self, source_string: str) -> SequenceAnalysis:
+        config = self.config()
+        top_element = section_parsing.build_tree(source_string, config.aliases, config.numeric)
+        counts = analysis.count_leaves(top_element)
+        resolved = self.resolve_all(top_element, config)
+
+        result = SequenceAnalysis(sum(counts.values()), config.numeric(0))
+        for element, count in counts.items():
+            if count > 0 and "time" in resolved[element].args:
+                result.duration += resolved[element].args["time"] * count
+        result.memory_bytes = analysis.estimate_memory(result.length, resolved)
+        return result
+
+    # Parse and expand a source once, for resolving later with different defaults or aliases.
+    # Args are parsed without aliases, which are applied when resolving.
+    def compile(self, source_string: str) -> CompiledSequence:
+        config = self.config()
+        top_element = section_parsing.build_tree(source_string, {}, config.numeric)
+        sequence = util.TreeExpander().tree_expand(top_element)
+        return CompiledSequence(top_element, sequence, config.numeric, config.defaults, config.aliases, self.make_resolved)
+
+    # parse() with the onset of each element, see TimedSequence.
+    # Onsets are summed up while the resolved elements are collected.
+    def parse_timed(self, source_string: str, loop: bool = False) -> TimedSequence:
+        config = self.config()
+        top_element = section_parsing.build_tree(source_string, config.aliases, config.numeric)
+        sequence = util.TreeExpander().tree_expand(top_element)
+        resolved = self.resolve_all(top_element, config)
+
+        # Time of each leaf, looked up once rather than for each occurrence
+        zero = config.numeric(0)
+        times = {leaf: element.args.get("time", zero) for leaf, element in resolved.items()}
+
+        elements = []
+        onsets = []
+        total = zero
+        for leaf in sequence:
+            elements.append(resolved[leaf])
+            onsets.append(total)
+            total += times[leaf]
+
+        return TimedSequence(elements, onsets, total, config.numeric, loop)
+
+    # Loop by loop version of parse(), see LoopSequence
+    def parse_loop(self, source_string: str) -> LoopSequence:
+        config = self.config()
+        top_element = section_parsing.build_tree(source_string, config.aliases, config.numeric)
+        return LoopSequence(top_element, self.resolve_all(top_element, config))
+
+    # Parse a new version of a source, reusing the sections of a previous result (from reparse(),
+    #   or None on the first call) that have not changed. The previous result should not be used afterwards.
+    def reparse(self, previous_result: IncrementalResult, source_string: str) -> IncrementalResult:
+
+        snapshot = self.config()
+        config = (snapshot.arg_aliases, snapshot.defaults_key, snapshot.numeric)
+        if previous_result is not None and previous_result.config != config:
+            previous_result = None
+
+        result = IncrementalResult(source_string, config, None, [])
+        result.tree, reused = incremental.build_tree(source_string, snapshot.aliases, snapshot.numeric, previous_result, result.section_texts)
+        if previous_result is not None:
+            incremental.copy_section_texts(reused, previous_result, result)
+
+        interner = ArgInterner()
+        incremental.resolve_tree(
+            result.tree, snapshot.defaults, snapshot.numeric, previous_result, result,
+            lambda element, args: self.make_resolved(element, args, interner)
+        )
+
+        sequence = util.TreeExpander().tree_expand(result.tree)
+        result.elements = [result.resolved[e] for e in sequence]
+        return result
+
+    # Resolve every atomic element in the tree in one top-down pass, keyed by element
+    def resolve_all(self, top_element: Element, config: ParserConfig = None) -> dict[Element, ResolvedElement]:
+        config = config or self.config()
+        resolved = {}
+        interner = ArgInterner()
+        for element, args in argument_resolution.resolve_tree(top_element, config.defaults, config.numeric).items():
+            resolved[element] = self.make_resolved(element, args, interner)
+        return resolved
+
+    def make_resolved(self, element: Element, args: dict, interner: ArgInterner = None) -> ResolvedElement:
+        interner = interner or ArgInterner()
+        info = information_parsing.get_information(element)
+        return ResolvedElement(
+            interner.string(info.prefix),
+            int(info.index_string) if info.index_string != "" else 0,
+            interner.string(info.suffix),
+            interner.args(args)
+        )
+
+    # Resolve a single atomic element by walking up its parents. Pass a config from config()
+    #   when resolving many elements, to snapshot the configuration once rather than for each.
+    def resolve(self, element: Element, config: ParserConfig = None) -> ResolvedElement:
+        config = config or self.config()
+
         match element.type:
             case ElementType.ATOMIC:
-                info = information_parsing.divide_information(element)
-                history = util.get_information_history(element)
-                args = util.resolve_full_arguments(
-                    history, self.arg_defaults, self.arg_aliases
-                )
-                
-                resolved = ResolvedElement(
-                    info.prefix, 
-                    int(info.index_string) if info.index_string != "" else 0,  
-                    info.suffix, 
-                    args
-                )
-                return resolved 
+                info = information_parsing.get_information(element)
+                history = util.get_argument_history(element)
+                args = util.resolve_arguments(history, config.defaults, config.numeric)
+                return self.make_resolved(element, args)
 
             case _:
                 raise Exception("Only ATOMIC elements can be resolved!")
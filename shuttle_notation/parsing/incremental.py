@@ -0,0 +1,159 @@
+"""
+
+    Incremental reparsing: bracketed sections whose source text is unchanged since the previous
+    parse keep their Element subtrees, parsed information and resolved args.
+
+"""
+
+from dataclasses import dataclass, field
+
+from shuttle_notation.parsing.element import Element, ElementType, ResolvedElement
+from shuttle_notation.parsing.section_parsing import SectionBuilder
+from shuttle_notation.parsing.tokenizer import tokenize, TokenType
+import shuttle_notation.parsing.argument_resolution as argument_resolution
+import shuttle_notation.parsing.information_parsing as information_parsing
+
+@dataclass
+class IncrementalResult:
+    source: str
+    config: tuple # Snapshot of (aliases, defaults) used when parsing
+    tree: Element
+    elements: list[ResolvedElement]
+    # Source text of each bracketed section, including its information
+    section_texts: dict[Element, str] = field(default_factory=dict)
+    # Key of the arg state handed down to each section from its parent, see argument_resolution.state_key()
+    section_states: dict[Element, tuple] = field(default_factory=dict)
+    resolved: dict[Element, ResolvedElement] = field(default_factory=dict)
+
+# Build the tree as section_parsing.build_tree() does, but take subtrees from the previous
+#   result where a section has the exact same source text.
+# Returns the tree and the subtrees that were reused.
+def build_tree(source_string: str, aliases: dict, numeric: type, previous: IncrementalResult, section_texts: dict) -> tuple:
+
+    # Each previous subtree can only be reused once, since alternations keep per-element state
+    reusable = {}
+    if previous is not None:
+        for section, text in previous.section_texts.items():
+            reusable.setdefault(text, []).append(section)
+
+    tokens = list(tokenize(source_string))
+
+    # Index of the matching CLOSE for each OPEN
+    closing = {}
+    opened = []
+    for i, token in enumerate(tokens):
+        if token.type == TokenType.OPEN:
+            opened.append(i)
+        elif token.type == TokenType.CLOSE:
+            closing[opened.pop()] = i
+
+    reused = []
+    used = set()
+    stack = [SectionBuilder()]
+    # Start offset of each open section
+    starts = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        match token.type:
+            case TokenType.ATOM:
+                atomic = Element()
+                atomic.type = ElementType.ATOMIC
+                atomic.information = source_string[token.start:token.end]
+                information_parsing.parse_element(atomic, aliases, numeric)
+                stack[-1].store(atomic)
+            case TokenType.ALTERNATION:
+                stack[-1].separate()
+            case TokenType.OPEN:
+                close = tokens[closing[i]]
+                text = source_string[token.start:close.end]
+                section = take_reusable(reusable.get(text, []), used)
+                if section is not None:
+                    reused.append(section)
+                    stack[-1].store(section)
+                    i = closing[i]
+                else:
+                    stack.append(SectionBuilder())
+                    starts.append(token.start)
+            case TokenType.CLOSE:
+                sub_section = stack.pop().finish()
+                sub_section.information = source_string[token.start + 1:token.end]
+                information_parsing.parse_element(sub_section, aliases, numeric)
+                section_texts[sub_section] = source_string[starts.pop():token.end]
+                stack[-1].store(sub_section)
+        i += 1
+
+    return stack[0].finish(), reused
+
+# Pick a previous subtree that shares no elements with those already reused,
+#   e.g. a section nested inside one that was reused as a whole.
+def take_reusable(candidates: list, used: set) -> Element:
+    while len(candidates) > 0:
+        section = candidates.pop()
+        subtree = []
+        stack = [section]
+        while stack:
+            node = stack.pop()
+            subtree.append(node)
+            stack.extend(node.elements)
+
+        if not any(node in used for node in subtree):
+            used.update(subtree)
+            return section
+
+    return None
+
+# Top-down resolution as in argument_resolution.resolve_tree(), copying previous results for
+#   reused sections that receive the same state as before.
+def resolve_tree(top_element: Element, default_args: dict, numeric: type, previous: IncrementalResult,
+                 result: IncrementalResult, make_resolved):
+
+    top_state = argument_resolution.apply_args(
+        argument_resolution.initial_state(default_args, numeric), information_parsing.get_args(top_element)
+    )
+    if top_element.type == ElementType.ATOMIC:
+        result.resolved[top_element] = make_resolved(top_element, argument_resolution.finish(top_state))
+        return
+
+    states = {top_element: top_state}
+    stack = [top_element]
+    while stack:
+        section = stack.pop()
+        state = states.pop(section)
+        key = None
+        for child in section.elements:
+
+            if child.type != ElementType.ATOMIC:
+                if key is None:
+                    key = argument_resolution.state_key(state)
+                if previous is not None and previous.section_states.get(child) == key:
+                    copy_resolved(child, previous, result)
+                    continue
+                result.section_states[child] = key
+
+            child_state = argument_resolution.apply_args(state, information_parsing.get_args(child))
+            if child.type == ElementType.ATOMIC:
+                result.resolved[child] = make_resolved(child, argument_resolution.finish(child_state))
+            else:
+                states[child] = child_state
+                stack.append(child)
+
+# Carry over everything known about an unchanged subtree
+def copy_resolved(section: Element, previous: IncrementalResult, result: IncrementalResult):
+    stack = [section]
+    while stack:
+        node = stack.pop()
+        if node.type == ElementType.ATOMIC:
+            result.resolved[node] = previous.resolved[node]
+        else:
+            result.section_states[node] = previous.section_states[node]
+            stack.extend(node.elements)
+
+# Register the nested sections of reused subtrees, so that later reparses can reuse them too
+def copy_section_texts(reused: list, previous: IncrementalResult, result: IncrementalResult):
+    stack = list(reused)
+    while stack:
+        node = stack.pop()
+        if node in previous.section_texts:
+            result.section_texts[node] = previous.section_texts[node]
+        stack.extend([child for child in node.elements if child.type != ElementType.ATOMIC])
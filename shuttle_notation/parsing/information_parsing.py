@@ -5,11 +5,12 @@
 """
 
 from dataclasses import dataclass
-from enum import Enum
 from decimal import Decimal
+from types import MappingProxyType
 
-from shuttle_notation.parsing.cursor import Cursor
 from shuttle_notation.parsing.element import Element, ElementType
+import shuttle_notation.parsing.profiling as profiling
+import shuttle_notation.parsing.scanner as scanner
 
 """
     TODO: Discussion on requirements.
@@ -21,7 +22,7 @@ from shuttle_notation.parsing.element import Element, ElementType
         -> Possible for section, of course, but not atomic
 
 """
-@dataclass
+@dataclass(slots=True)
 class ElementInformation:
     prefix: str = "" # Contents prior to first numeric or special symbol
     index_string: str = "" # First numeric or special symbol
@@ -29,172 +30,94 @@ class ElementInformation:
     repetition: int = 1 # Contents after "*", but before ":"
     arg_source: str = "" # Final contents, after ":"
 
-class InformationPart(Enum):
-    PREFIX = 0
-    INDEX = 1
-    SUFFIX = 2
-    REPETITION = 3
-    ARGS = 4
-
 def divide_information(element: Element) -> ElementInformation:
 
+    stats = profiling.state.current
+    if stats is not None:
+        stats.divide_information_calls += 1
+
     # Initiate with blank defaults
     information = ElementInformation()
 
-    # Sections start at suffix; they have no prefix or index
-    current_part = InformationPart.SUFFIX \
-        if element.type in [ElementType.SECTION, ElementType.ALTERNATION_SECTION] \
-        else InformationPart.PREFIX
-
-    # Return blank when no information string is provided
-    if element.information == "":
+    source = element.information
+    if source == "":
         return information
 
-    cursor = Cursor(element.information)
-
-    NUMBERS = "0123456789"
-
-    while True:
-        match current_part:
-            case InformationPart.PREFIX:
-
-                before_colon = element.information.split(":")[0]
-                smol_cursor = Cursor(before_colon)
-
-                if not smol_cursor.contains_any(NUMBERS):
-                    current_part = InformationPart.SUFFIX
-                    # NOTE: Implicit straight-to-suffix on no number
-                    # Below is the error we used to throw:
-                    #raise Exception("Malformed input - element information has no index: " + element.information)
-                else:
-
-                    until_number = cursor.get_until(NUMBERS)
-                    information.prefix = until_number
-
-                    # NOTE: Cursor weakness - if first character matches get_until we don't stop "before it"
-                    if cursor.get() not in NUMBERS:
-                        cursor.next()
-
-                    current_part = InformationPart.INDEX
-
-            case InformationPart.INDEX:
-                information.index_string = cursor.get_until("0123456789", False)
-
-                # NOTE: Again, cursor weakness
-                if cursor.get() in NUMBERS:
-                    cursor.next()
-
-                current_part = InformationPart.SUFFIX
-
-            case InformationPart.SUFFIX:
-
-                remaining = cursor.get_remaining()
-
-                star_index = remaining.find("*")
-                colon_index = remaining.find(":")
-
-                # Since * can appear inside args, we need to check for it before arg declaration
-                star_present = star_index != -1 and (star_index < colon_index or colon_index == -1)
-
-                if star_present:
-                    information.suffix = cursor.get_until("*")
-                    cursor.move_past_next("*")
-                    current_part = InformationPart.REPETITION
-                elif ":" in remaining:
-                    information.suffix = cursor.get_until(":")
-                    cursor.move_past_next(":")
-                    current_part = InformationPart.ARGS
-                else:
-                    information.suffix = remaining
-                    break
-
-            case InformationPart.REPETITION:
-                remaining = cursor.get_remaining()
-                if ":" in remaining:
-                    information.repetition = int(cursor.get_until(":"))
-                    cursor.move_past_next(":")
-                    current_part = InformationPart.ARGS
-                elif remaining != "":
-                    information.repetition = int(remaining)
-                    break
-
-            case InformationPart.ARGS:
-                if not cursor.is_done():
-                    information.arg_source = cursor.get_remaining()
-
-                break
-
-            case _:
-                # Shouldn't happen but w/e
-                break
+    # Sections start at suffix; they have no prefix or index
+    prefix, index, suffix, repetition, arg_source = scanner.scan_information(
+        source, element.type in [ElementType.SECTION, ElementType.ALTERNATION_SECTION]
+    )
+
+    information.prefix = source[prefix[0]:prefix[1]]
+    information.index_string = source[index[0]:index[1]]
+    information.suffix = source[suffix[0]:suffix[1]]
+    if repetition[0] != -1:
+        # NOTE: A "*" without a count used to loop forever, it now fails to convert like other bad counts
+        information.repetition = int(source[repetition[0]:repetition[1]])
+    if arg_source[0] != -1:
+        information.arg_source = source[arg_source[0]:arg_source[1]]
 
     return information
 
-@dataclass
+@dataclass(slots=True)
 class DynamicArg:
-    value: Decimal
+    value: Decimal # Or float/Fraction, depending on the numeric type used when parsing
     operator: str = ""
     other_arg_reference: str = ""
 
+# Default for aliases; read-only, since a shared {} default could be changed by any caller
+NO_ALIASES = MappingProxyType({})
+
 # Parse 1.0,arg+2,argb*2.0,argc0.2 [...] part of element info suffix
 # Aliases, provided as {alias:name}, changes <alias> into <name> where
 #   keys match.
-def parse_args(arg_source, aliases: dict = {}) -> dict:
+# Values are constructed from their strings with the given numeric type (Decimal, float or Fraction).
+def parse_args(arg_source, aliases: dict = NO_ALIASES, numeric: type = Decimal) -> dict:
+
+    stats = profiling.state.current
+    if stats is not None:
+        stats.parse_args_calls += 1
 
     args = {}
 
-    cursor = Cursor(arg_source)
-    while True:
-        # Step on separator at a time
-        content = cursor.get_until(",")
-
-        sub_cursor = Cursor(content)
-        # Numbers or operators break the key part
-        # TODO: Consider ".2" shorthand support
-        non_numeric = sub_cursor.get_until("0123456789+-*=")
-
-        # Step into the numeric part of the string unless it began immediately
-        if sub_cursor.peek() != "" and non_numeric != "":
-            sub_cursor.next()
-
-        value_part = sub_cursor.get_remaining()
-
-        if value_part != "":
-
-            actual_value = "".join(value_part[1:]) if value_part[0] in "+-*=" else value_part
-            sym = value_part[0] if value_part[0] in "+-*=" else ""
-
-            # Find letter arg reference suffix after numerical part
-            lil_cursor = Cursor(actual_value)
-            # TODO: I mean "get until not" would of course be more intuitive
-            # ... but we should replace this whole thing with regex eventually
-            num_value = lil_cursor.get_until("abcdefghijklmnopqrstuvxyz")
-            ref_part = ""
-            if lil_cursor.peek() != "" and num_value != "":
-                lil_cursor.next()
-                # As in: sus1.0relT -> relT
-                ref_part = lil_cursor.get_remaining()
-
-            numeric_decimal = Decimal(num_value)
-
-            new_arg = DynamicArg(numeric_decimal, sym, ref_part)
-
-            if non_numeric == "":
-                if len(args) == 0:
-                    # TODO: Some other way to provide this default
-                    # First arg is "time" unless otherwise noted
-                    args["time"] = new_arg
-                else:
-                    raise Exception("Malformed input: unnamed non-first arg")
+    for name, operator, number, reference in scanner.scan_args(arg_source):
+        new_arg = DynamicArg(
+            numeric(arg_source[number[0]:number[1]]),
+            arg_source[operator[0]:operator[1]],
+            arg_source[reference[0]:reference[1]]
+        )
+
+        if name[0] == name[1]:
+            if len(args) == 0:
+                # TODO: Some other way to provide this default
+                # First arg is "time" unless otherwise noted
+                args["time"] = new_arg
             else:
-                # Apply alias
-                if non_numeric in aliases:
-                    non_numeric = aliases[non_numeric]
-
-                args[non_numeric] = new_arg
-
-        cursor.move_past_next(",")
-        if cursor.is_done():
-            break
+                raise Exception("Malformed input: unnamed non-first arg")
+        else:
+            # Apply alias
+            key = arg_source[name[0]:name[1]]
+            args[aliases.get(key, key)] = new_arg
 
     return args
+
+# Parse the information string of the element and store the result on it, so that
+#   later stages never have to divide or parse it again.
+# Args are left for get_args() unless aliases are provided (pass {} for none).
+def parse_element(element: Element, aliases: dict = None, numeric: type = Decimal):
+    element.info = divide_information(element)
+    if aliases is not None:
+        element.args = parse_args(element.info.arg_source, aliases, numeric) if element.info.arg_source != "" else {}
+
+# Parsed information of the element, parsed on first access if not done when building the tree
+def get_information(element: Element) -> ElementInformation:
+    if element.info is None:
+        parse_element(element)
+    return element.info
+
+# Parsed args of the element, see get_information()
+def get_args(element: Element) -> dict:
+    if element.args is None:
+        arg_source = get_information(element).arg_source
+        element.args = parse_args(arg_source) if arg_source != "" else {}
+    return element.args
@@ -0,0 +1,127 @@
+"""
+
+    Loop by loop expansion of a sequence, for live looping.
+
+    One iteration is a single pass over the top level elements; tree_expand() returns the first
+    cycle_length iterations, which is as many as its slowest alternation needs. Later iterations
+    continue the alternations where they left off.
+
+    The tick counts of all alternations act as a mixed-radix counter over the iterations, and can be
+    computed directly from the iteration number (see analysis.count_expansions()). Iteration k is
+    therefore found without expanding the ones before it.
+
+"""
+
+from shuttle_notation.parsing.element import Element, ElementType, ResolvedElement
+import shuttle_notation.parsing.analysis as analysis
+import shuttle_notation.parsing.util as util
+
+class LoopSequence:
+
+    # Iterations are given as resolved elements if resolved is provided, otherwise as atomic elements
+    def __init__(self, top_element: Element, resolved: dict[Element, ResolvedElement] = None):
+        # Top level alternations are looped one round at a time, as in tree_expand()
+        if top_element.type == ElementType.SECTION:
+            self.root = top_element
+        else:
+            self.root = Element()
+            self.root.type = ElementType.SECTION
+            self.root.elements = [top_element]
+
+        self.resolved = resolved
+
+        prepared = util.TreeExpander()
+        prepared.count_required_alternations(self.root)
+        self.cycle_length = analysis.first_passes(self.root, prepared)
+
+        # Iteration returned by the next step(), and the expander state leading up to it
+        self.position = 0
+        self.expander: util.TreeExpander = None
+
+    # Expander in the state left after the given amount of iterations
+    def seek_expander(self, iterations: int) -> util.TreeExpander:
+        expander = util.TreeExpander()
+        expander.count_required_alternations(self.root)
+        expansions = analysis.count_expansions(self.root, iterations, expander)
+
+        # Children come after their parents, so reversed order is bottom-up
+        order = []
+        stack = list(self.root.elements)
+        while stack:
+            element = stack.pop()
+            order.append(element)
+            stack.extend(element.elements)
+
+        for element in reversed(order):
+            count = expansions[element]
+            match element.type:
+                case ElementType.SECTION:
+                    # One tick per expansion, and another for each extra pass of the first
+                    ticks = count + analysis.first_passes(element, expander) - 1 if count > 0 else 0
+                case ElementType.ALTERNATION_SECTION:
+                    ticks = count * util.get_repeat(element)
+                case _:
+                    ticks = count
+            if ticks > 0:
+                expander.ticks[element] = ticks
+
+            pending = len([child for child in element.elements if child not in expander.completed])
+            expander.pending[element] = pending
+            if pending == 0 and ticks >= expander.required_ticks[element]:
+                expander.completed.add(element)
+
+        expander.pending[self.root] = len([child for child in self.root.elements if child not in expander.completed])
+        return expander
+
+    def expand_iteration(self, expander: util.TreeExpander) -> list:
+        output = []
+        for child in self.root.elements:
+            output.extend(expander.expand(child, util.get_repeat(child)))
+
+        if self.resolved is not None:
+            return [self.resolved[element] for element in output]
+        return output
+
+    # Elements of iteration k, in time proportional to the tree size and the length of the iteration
+    def iteration(self, k: int) -> list:
+        return self.expand_iteration(self.seek_expander(k))
+
+    # Elements of the next iteration, continuing from the state left by the previous call
+    def step(self) -> list:
+        if self.expander is None:
+            self.expander = self.seek_expander(self.position)
+        self.position += 1
+        return self.expand_iteration(self.expander)
+
+    # Make the next step() return iteration k
+    def seek(self, k: int):
+        self.position = k
+        self.expander = None
+
+# Same as util.TreeExpander().tree_expand(), expanding groups of top level elements on their own.
+# Top level elements share no expansion state (see streaming.py), so the groups can be expanded
+#   concurrently by passing the map() of e.g. a thread pool. Sources with a top level "/" are one
+#   alternation, and are expanded as a whole.
+def split_expand(top_element: Element, groups: int, map = map) -> list:
+    if top_element.type != ElementType.SECTION or len(top_element.elements) < 2:
+        return util.TreeExpander().tree_expand(top_element)
+
+    passes = LoopSequence(top_element).cycle_length
+
+    # Contiguous groups, so that joining their passes keeps the order
+    children = top_element.elements
+    size = -(-len(children) // groups)
+    roots = []
+    for start in range(0, len(children), size):
+        root = Element()
+        root.type = ElementType.SECTION
+        # Parents are left alone; they are only needed for resolving args
+        root.elements = children[start:start + size]
+        roots.append(root)
+
+    def expand_group(root: Element) -> list[list]:
+        loop = LoopSequence(root)
+        return [loop.step() for _ in range(passes)]
+
+    expanded = list(map(expand_group, roots))
+    return [element for index in range(passes) for group in expanded for element in group[index]]
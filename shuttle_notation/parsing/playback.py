@@ -0,0 +1,112 @@
+"""
+
+    Real-time playback of parsed sequences with asyncio.
+
+    Each element is emitted at its onset: the sum of the "time" args of the elements before it,
+    in beats, at the current tempo. Onsets are scheduled from the start of playback rather than
+    from the previous wakeup, so late wakeups and slow callbacks do not add up to drift.
+
+"""
+
+import asyncio
+import inspect
+import math
+import time
+from dataclasses import dataclass
+
+from shuttle_notation.parsing.element import ResolvedElement
+
+class MonotonicClock:
+    def now(self) -> float:
+        return time.monotonic()
+
+    async def sleep_until(self, deadline: float):
+        delay = deadline - self.now()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+# Clock that only moves when slept on, for running playback instantly in tests.
+# Each sleep wakes up late by lateness(), to simulate a loaded system.
+class VirtualClock:
+    def __init__(self, start: float = 0.0, lateness = None):
+        self.time = start
+        self.lateness = lateness
+
+    def now(self) -> float:
+        return self.time
+
+    async def sleep_until(self, deadline: float):
+        self.time = max(self.time, deadline)
+        if self.lateness is not None:
+            self.time += self.lateness()
+        # Let other tasks run, as a real sleep would
+        await asyncio.sleep(0)
+
+# How late elements were emitted compared to their scheduled onsets, in seconds
+@dataclass
+class JitterStats:
+    count: int = 0
+    total: float = 0.0
+    total_squares: float = 0.0
+    max: float = 0.0
+
+    def record(self, lateness: float):
+        self.count += 1
+        self.total += lateness
+        self.total_squares += lateness * lateness
+        self.max = max(self.max, lateness)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+    @property
+    def deviation(self) -> float:
+        if self.count == 0:
+            return 0.0
+        return math.sqrt(max(self.total_squares / self.count - self.mean * self.mean, 0.0))
+
+class Scheduler:
+
+    # Elements can be any iterable, such as a parse() list or a lazy Parser.iter_parse().
+    # callback(element) is called at each onset and awaited if it returns an awaitable.
+    # Elements without a "time" arg last default_time beats.
+    def __init__(self, elements, callback, tempo: float = 120.0, clock = None, default_time: float = 1.0):
+        self.elements = elements
+        self.callback = callback
+        self.tempo = tempo # Beats per minute
+        self.clock = clock or MonotonicClock()
+        self.default_time = default_time
+        self.stats = JitterStats()
+        self.running = False
+
+    # Takes effect from the next onset onwards
+    def set_tempo(self, tempo: float):
+        self.tempo = tempo
+
+    def stop(self):
+        self.running = False
+
+    def duration(self, element: ResolvedElement) -> float:
+        beats = element.args.get("time")
+        return (float(beats) if beats is not None else self.default_time) * 60.0 / self.tempo
+
+    # Errors raised by the callback end the run and are passed on to the caller
+    async def run(self):
+        self.running = True
+        onset = self.clock.now()
+
+        try:
+            for element in self.elements:
+                await self.clock.sleep_until(onset)
+                if not self.running:
+                    break
+                self.stats.record(self.clock.now() - onset)
+
+                result = self.callback(element)
+                if inspect.isawaitable(result):
+                    await result
+
+                onset += self.duration(element)
+        finally:
+            self.running = False
@@ -0,0 +1,59 @@
+"""
+
+    Single-pass scanning of element information and arg strings with precompiled patterns.
+    Returns index spans into the scanned string, leaving any copying to the caller.
+
+    Matches the results of the Cursor-based divide_information_old() and parse_args_old()
+    in benchmarks/old_implementations.py, quirks included.
+
+"""
+
+import re
+
+# prefix index suffix *repetition :args
+# The prefix and index only exist when a digit comes before the first ":".
+INFORMATION_PATTERN = re.compile(r"(?:[^0-9:]*(?=[0-9]))?([0-9]*)([^*:]*)(?:\*([^:]*))?(?::(.*))?", re.DOTALL)
+
+# Sections have no prefix or index; the empty group keeps the group numbers aligned
+SECTION_INFORMATION_PATTERN = re.compile(r"()([^*:]*)(?:\*([^:]*))?(?::(.*))?", re.DOTALL)
+
+# name operator number reference, for one comma separated arg.
+# Names end at the first digit or operator, numbers at the first letter (which does not include "w").
+ARG_PATTERN = re.compile(r"([^,0-9+\-*=]*)([+\-*=]?)([^,abcdefghijklmnopqrstuvxyz]*)([^,]*)")
+NUMBER_PATTERN = re.compile(r"[^abcdefghijklmnopqrstuvxyz]*")
+
+# Spans of the (prefix, index, suffix, repetition, args) parts of an information string.
+# Absent repetition and args parts are given as (-1, -1).
+def scan_information(information: str, is_section: bool = False) -> tuple:
+    pattern = SECTION_INFORMATION_PATTERN if is_section else INFORMATION_PATTERN
+    match = pattern.match(information)
+    index = match.span(1)
+    return ((0, index[0]), index, match.span(2), match.span(3), match.span(4))
+
+# Spans of the (name, operator, number, reference) parts of each arg in a comma separated arg string.
+# Empty args are skipped. A missing operator is given as an empty span.
+def scan_args(arg_source: str) -> list[tuple]:
+    spans = []
+    position = 0
+    length = len(arg_source)
+
+    while position < length:
+        match = ARG_PATTERN.match(arg_source, position)
+        end = match.end()
+
+        if end > position:
+            name = match.span(1)
+            if name[1] == end:
+                # No digit or operator: the last character is read as the number,
+                #   see the note on Cursor.get_until() in parse_args_old()
+                number_end = NUMBER_PATTERN.match(arg_source, end - 1, end).end()
+                spans.append((name, (end - 1, end - 1), (end - 1, number_end), (number_end, number_end)))
+            else:
+                number = match.span(3)
+                # References only follow a number
+                reference = match.span(4) if number[1] > number[0] else (number[1], number[1])
+                spans.append((name, match.span(2), number, reference))
+
+        position = end + 1
+
+    return spans
@@ -5,110 +5,101 @@ Parsing logic related to "()"-sections, "/"-alternation and "x"-repetition.
 """
 
 from shuttle_notation.parsing.element import Element, ElementType
-from shuttle_notation.parsing.cursor import Cursor
-import shuttle_notation.parsing.util as util
-
-import json 
-
-# Divides string into Elements, arranged in a tree structure
-#   as dictated by section syntax. 
-def build_tree(source_string) -> Element:
-    
-    current_element = Element()
-    current_element.type = ElementType.SECTION 
-
-    def store(element):
-        if current_element.type == ElementType.ALTERNATION_SECTION:
-            current_alternation.append(element)
+from shuttle_notation.parsing.tokenizer import tokenize, TokenType
+import shuttle_notation.parsing.information_parsing as information_parsing
+
+from decimal import Decimal
+
+# Collects the elements of one bracketed section while its tokens are read
+class SectionBuilder:
+    def __init__(self):
+        self.element = Element()
+        self.element.type = ElementType.SECTION
+        # Elements read since the last "/", if the section is an alternation
+        self.alternation = []
+
+    def store(self, element):
+        if self.element.type == ElementType.ALTERNATION_SECTION:
+            self.alternation.append(element)
         else:
-            current_element.elements.append(element)
-            element.parent = current_element
+            self.element.elements.append(element)
+            element.parent = self.element
 
-    def end_current_alternation(alternation):
-
-        if len(alternation) > 1:
-            sub_section = current_element.add()
+    def end_alternation(self):
+        if len(self.alternation) > 1:
+            sub_section = self.element.add()
             sub_section.type = ElementType.SECTION
-            
-            for ele in alternation:
+
+            for ele in self.alternation:
                 ele.parent = sub_section
                 sub_section.elements.append(ele)
         else:
-            # Looped to be 0-len safe, although typically one element 
-            for ele in alternation:
-                ele.parent = current_element
-                current_element.elements.append(ele)
-
-
-    # Divide into substrings, separated by space unless bracketed
-    # Dealing with one bracket-layer at a time 
-    current_alternation = []
-    for substring in util.section_split(source_string):
-
-        if "(" in substring or ")" in substring:
-
-            # Grab meta-information and then recursively parse bracketed sections 
-
-            if substring[0] != "(":
-                raise Exception("Malformed input - section does not start with '(' :" + substring)
-
-            # TODO: Suffix should be allowed to contain ")" - we should not look for the last index
-            #   but for the index of when all parentheses have been closed. 
-            end_index = substring.rfind(")")
-
-            if end_index == -1:
-                raise Exception("Malformed input - section does not have an ending ')': " + substring)
-
-            # Perform information gathering 
-            end_information = "".join(substring[end_index + 1:]) if substring[-1] != ")" else ""
-
-            unwrap = "".join(substring[1:end_index])
-
-            sub_section = build_tree(unwrap)
-            sub_section.information = end_information
-            store(sub_section)
-
-        elif substring == "/":
-
-            if current_element.type == ElementType.ALTERNATION_SECTION:
-
-                if len(current_alternation) == 0:
-                    raise Exception("Malformed input - possible duplicate '/':")
-
-                # Not the first encountered / 
-                # Take all elements created since the last /
-                # Add them as a section if multiple 
-                
-                end_current_alternation(current_alternation) 
-                current_alternation = []
-
-            elif len(current_element.elements) > 0: 
-                # Classify ongoing section as alternation
-                # Move any previously passed elements into a subsection (if plural)
-                current_element.type = ElementType.ALTERNATION_SECTION
-                current_alternation = []
-                
-                if len(current_element.elements) > 1:
-                    port = current_element.elements 
-                    sub_section = Element()
-                    sub_section.type = ElementType.SECTION
-                    sub_section.elements = port
-                    for e in sub_section.elements:
-                        e.parent = sub_section
-                    current_element.elements = [sub_section]
-                    
-            else:
-                raise Exception("Malformed input - '/' written before any other elements in section")
+            # Looped to be 0-len safe, although typically one element
+            for ele in self.alternation:
+                ele.parent = self.element
+                self.element.elements.append(ele)
+
+        self.alternation = []
+
+    def separate(self):
+        if self.element.type == ElementType.ALTERNATION_SECTION:
+
+            if len(self.alternation) == 0:
+                raise Exception("Malformed input - possible duplicate '/':")
+
+            # Not the first encountered /
+            # Take all elements created since the last /
+            # Add them as a section if multiple
+            self.end_alternation()
+
+        elif len(self.element.elements) > 0:
+            # Classify ongoing section as alternation
+            # Move any previously passed elements into a subsection (if plural)
+            self.element.type = ElementType.ALTERNATION_SECTION
+
+            if len(self.element.elements) > 1:
+                sub_section = Element()
+                sub_section.type = ElementType.SECTION
+                sub_section.elements = self.element.elements
+                sub_section.parent = self.element
+                for e in sub_section.elements:
+                    e.parent = sub_section
+                self.element.elements = [sub_section]
+
         else:
-            # Regular, atomic entry 
-            atomic = Element() 
-            atomic.type = ElementType.ATOMIC
-            atomic.information = substring
-
-            store(atomic)
-
-    # In case last element is part of an alternation (post-/)
-    end_current_alternation(current_alternation)
-    current_alternation = []
-    
-    return current_element
+            raise Exception("Malformed input - '/' written before any other elements in section")
+
+    def finish(self) -> Element:
+        # In case last element is part of an alternation (post-/)
+        self.end_alternation()
+        return self.element
+
+# Divides string into Elements, arranged in a tree structure
+#   as dictated by section syntax.
+# Reads the tokens in a single pass, keeping one builder per open bracket.
+# Information of each element is divided once here, and args are parsed with the
+#   given aliases unless None (see information_parsing.parse_element()).
+def build_tree(source_string, aliases: dict = None, numeric: type = Decimal) -> Element:
+
+    stack = [SectionBuilder()]
+
+    for token in tokenize(source_string):
+        match token.type:
+            case TokenType.ATOM:
+                atomic = Element()
+                atomic.type = ElementType.ATOMIC
+                atomic.information = source_string[token.start:token.end]
+                information_parsing.parse_element(atomic, aliases, numeric)
+                stack[-1].store(atomic)
+            case TokenType.ALTERNATION:
+                stack[-1].separate()
+            case TokenType.OPEN:
+                stack.append(SectionBuilder())
+            case TokenType.CLOSE:
+                sub_section = stack.pop().finish()
+                # Information is whatever follows the closing bracket
+                sub_section.information = source_string[token.start + 1:token.end]
+                information_parsing.parse_element(sub_section, aliases, numeric)
+                stack[-1].store(sub_section)
+
+    return stack[0].finish()
@@ -0,0 +1,44 @@
+"""
+
+    Random-access view of an expanded sequence, backed by the blocks of
+    TreeExpander.block_expand() rather than a flat list.
+
+"""
+
+from collections.abc import Sequence
+
+from shuttle_notation.parsing.element import Element, ResolvedElement
+import shuttle_notation.parsing.util as util
+
+class SequenceView(Sequence):
+
+    def __init__(self, block: util.Block, resolved: dict[Element, ResolvedElement]):
+        self.block = block
+        # Resolved version of each atomic element in the blocks
+        self.resolved = resolved
+        self.length = len(block)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step == 1:
+                return [element for _, element in zip(range(start, stop), self.iter_from(start))]
+            return [self[i] for i in range(start, stop, step)]
+
+        if index < 0:
+            index += self.length
+        if index < 0 or index >= self.length:
+            raise IndexError("sequence index out of range")
+
+        return self.resolved[self.block.get(index)]
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    # Iterate from the given position onwards, e.g. when seeking into a long loop
+    def iter_from(self, start: int):
+        for element in util.iter_block(self.block, start):
+            yield self.resolved[element]
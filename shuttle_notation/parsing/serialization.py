@@ -0,0 +1,221 @@
+"""
+
+    Binary files of parse results, and an on-disk cache of them.
+
+    Files hold the packed form of batch.pack(): every string once in a table, each distinct
+    element once as a row, and the sequence as an array of row ids. Arrays are written as raw
+    machine values and read back as memoryviews over an mmap, without copying.
+
+    Layout, after the header (all arrays padded to 8 bytes):
+        string offsets (I, strings + 1), string data (UTF-8)
+        layout sizes (I, layouts), layout names (I string ids)
+        row prefixes (I), row indices (q), row suffixes (I), row layouts (I), row values (I string ids)
+        sequence (I row ids)
+
+"""
+
+from array import array
+from decimal import Decimal
+from fractions import Fraction
+import hashlib
+import importlib.metadata
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from shuttle_notation.parsing.element import ResolvedElement, ArgInterner
+import shuttle_notation.parsing.batch as batch
+
+MAGIC = b"SHNS"
+FORMAT_VERSION = 1
+
+# magic, format version, byte order, numeric type, then the counts of
+#   strings, string bytes, layouts, layout names, rows, row values and sequence elements
+HEADER = struct.Struct("<4sHBB7Q")
+
+NUMERIC_TYPES = [Decimal, float, Fraction]
+
+# Version of the installed package, or for source checkouts, a hash of the parsing modules,
+#   so that checkouts at different revisions do not share cache files
+def library_version() -> str:
+    try:
+        return importlib.metadata.version("shuttle_notation")
+    except importlib.metadata.PackageNotFoundError:
+        pass
+
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".py"):
+            digest.update(name.encode("utf-8"))
+            with open(os.path.join(directory, name), "rb") as file:
+                digest.update(file.read())
+    return "source-" + digest.hexdigest()
+
+def padding(length: int) -> bytes:
+    return b"\0" * (-length % 8)
+
+def dump(elements: list[ResolvedElement], numeric: type, file):
+    layouts, rows, sequence = batch.pack(elements)
+
+    strings = {}
+    def string_id(string: str) -> int:
+        return strings.setdefault(string, len(strings))
+
+    layout_sizes = array("I", [len(names) for names in layouts])
+    layout_names = array("I", [string_id(name) for names in layouts for name in names])
+    prefixes = array("I", [string_id(row[0]) for row in rows])
+    indices = array("q", [row[1] for row in rows])
+    suffixes = array("I", [string_id(row[2]) for row in rows])
+    row_layouts = array("I", [row[3] for row in rows])
+    values = array("I", [string_id(value) for row in rows for value in row[4]])
+
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = array("I", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    string_data = b"".join(encoded)
+
+    file.write(HEADER.pack(
+        MAGIC, FORMAT_VERSION, sys.byteorder == "little", NUMERIC_TYPES.index(numeric),
+        len(encoded), len(string_data), len(layouts), len(layout_names), len(rows), len(values), len(sequence)
+    ))
+    for part in [offsets, string_data, layout_sizes, layout_names, prefixes, indices, suffixes, row_layouts, values, sequence]:
+        data = part.tobytes() if isinstance(part, array) else part
+        file.write(data)
+        file.write(padding(len(data)))
+
+# Read a file written by dump(), returning the elements and the numeric type they were parsed with
+def load(path: str) -> tuple[list[ResolvedElement], type]:
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                return read(view)
+            finally:
+                view.release()
+
+def read(view: memoryview) -> tuple[list[ResolvedElement], type]:
+    magic, version, little_endian, numeric_code, string_count, string_bytes, layout_count, \
+        layout_name_count, row_count, value_count, sequence_length = HEADER.unpack_from(view)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise Exception("Unsupported sequence file")
+    numeric = NUMERIC_TYPES[numeric_code]
+    swap = bool(little_endian) != (sys.byteorder == "little")
+
+    # Truncated files would otherwise read as shorter sequences
+    sizes = [4 * (string_count + 1), string_bytes, 4 * layout_count, 4 * layout_name_count,
+             4 * row_count, 8 * row_count, 4 * row_count, 4 * row_count, 4 * value_count, 4 * sequence_length]
+    if len(view) != HEADER.size + sum([size + (-size % 8) for size in sizes]):
+        raise Exception("Sequence file has the wrong size")
+
+    views = []
+    position = HEADER.size
+    def take(format: str, count: int):
+        nonlocal position
+        size = count * struct.calcsize(format)
+        part = view[position:position + size]
+        position += size + (-size % 8)
+        if format == "B":
+            return part
+        if swap:
+            # Files from machines of the other byte order have to be copied to be swapped
+            copied = array(format, part.tobytes())
+            copied.byteswap()
+            return copied
+        part = part.cast(format)
+        views.append(part)
+        return part
+
+    try:
+        offsets = take("I", string_count + 1)
+        string_data = take("B", string_bytes)
+        strings = [str(string_data[offsets[i]:offsets[i + 1]], "utf-8") for i in range(string_count)]
+        string_data.release()
+
+        layout_sizes = take("I", layout_count)
+        layout_names = take("I", layout_name_count)
+        layouts = []
+        start = 0
+        for size in layout_sizes:
+            layouts.append(tuple([strings[i] for i in layout_names[start:start + size]]))
+            start += size
+
+        prefixes = take("I", row_count)
+        indices = take("q", row_count)
+        suffixes = take("I", row_count)
+        row_layouts = take("I", row_count)
+        values = take("I", value_count)
+        sequence = take("I", sequence_length)
+
+        # Values are converted once per distinct string
+        numbers = {}
+        def number(string_id: int):
+            value = numbers.get(string_id)
+            if value is None:
+                value = numeric(strings[string_id])
+                numbers[string_id] = value
+            return value
+
+        interner = ArgInterner()
+        distinct = []
+        start = 0
+        for row in range(row_count):
+            names = layouts[row_layouts[row]]
+            args = {}
+            for name in names:
+                args[name] = number(values[start])
+                start += 1
+            distinct.append(ResolvedElement(
+                interner.string(strings[prefixes[row]]),
+                indices[row],
+                interner.string(strings[suffixes[row]]),
+                interner.args(args)
+            ))
+
+        return [distinct[row_id] for row_id in sequence], numeric
+    finally:
+        # Views must be released before the mmap can be closed
+        for part in views:
+            part.release()
+
+# Directory of sequence files, named by a hash of what they were parsed from
+class DiskCache:
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # Looked up once, since importlib.metadata reads the installed package files
+        self.version = library_version()
+
+    # key: the source and parser configuration, as used for Parser.cache
+    def path(self, key: tuple) -> str:
+        digest = hashlib.sha256(repr((FORMAT_VERSION, self.version, key)).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + ".shns")
+
+    # Only the numeric types that files can record are cached
+    def supports(self, numeric: type) -> bool:
+        return numeric in NUMERIC_TYPES
+
+    # Cached elements, or None if there are none. Unreadable files (truncated, corrupted or
+    #   of another format) count as missing, and are replaced by the next store().
+    def load(self, key: tuple) -> list[ResolvedElement]:
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return load(path)[0]
+        except Exception:
+            return None
+
+    def store(self, key: tuple, elements: list[ResolvedElement], numeric: type):
+        # Written under a temporary name first, so that readers never see partial files
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as file:
+                dump(elements, numeric, file)
+            os.replace(temporary, self.path(key))
+        except BaseException:
+            os.remove(temporary)
+            raise
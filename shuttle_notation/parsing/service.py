@@ -0,0 +1,108 @@
+"""
+
+    JSON-lines parsing service, for tools outside of Python (see python -m shuttle_notation).
+
+    Each request is one line: either a JSON string with the source, or an object
+        {"source": "...", "id": <anything, echoed back>}
+    Each response is one line, in the same order as the requests:
+        {"id": ..., "elements": [{"prefix": "c", "index": 4, "suffix": "", "args": {"sus": 0.5}}, ...]}
+    or, if the source could not be parsed:
+        {"id": ..., "error": "..."}
+    Sources that would expand to more elements than the limit, or never finish expanding,
+    are answered with an error before they are parsed.
+
+    Arg values are written as JSON numbers, converted through float: Decimal and Fraction values
+    lose any precision beyond that of a double. The same protocol is served on stdin/stdout and on Unix sockets,
+    where a single warm Parser (and its caches) is shared by all clients, which are served concurrently.
+
+"""
+
+import functools
+import json
+import os
+import socketserver
+import stat
+
+from shuttle_notation.parsing.element import ResolvedElement
+from shuttle_notation.parsing.full_parse import Parser
+import shuttle_notation.parsing.analysis as analysis
+import shuttle_notation.parsing.section_parsing as section_parsing
+
+# Elements a single request may expand to, see check_length()
+DEFAULT_MAX_LENGTH = 1000000
+
+def element_json(element: ResolvedElement) -> dict:
+    return {"prefix": element.prefix, "index": element.index, "suffix": element.suffix, "args": dict(element.args)}
+
+# Amount of elements a source expands to, counted without expanding (see analysis.count_leaves()).
+# Fails on sources that would never finish expanding.
+# Kept per source like parse results are, since clients tend to send the same sources again.
+@functools.lru_cache(maxsize=1024)
+def expanded_length(source: str) -> int:
+    return sum(analysis.count_leaves(section_parsing.build_tree(source)).values())
+
+# Refuse sources that expand beyond max_length elements (None for no limit)
+def check_length(source: str, max_length: int):
+    if max_length is None:
+        return
+    length = expanded_length(source)
+    if length > max_length:
+        raise Exception("Malformed request - source expands to " + str(length) + " elements, over the limit of " + str(max_length))
+
+def handle_line(parser: Parser, line: str, max_length: int = DEFAULT_MAX_LENGTH) -> str:
+    request_id = None
+    try:
+        request = json.loads(line)
+        if isinstance(request, dict):
+            request_id = request.get("id")
+            source = request["source"]
+        else:
+            source = request
+        if not isinstance(source, str):
+            raise Exception("Malformed request - source must be a string")
+
+        check_length(source, max_length)
+
+        response = {"id": request_id, "elements": [element_json(e) for e in parser.parse(source)]}
+    except Exception as exception:
+        response = {"id": request_id, "error": str(exception) or type(exception).__name__}
+
+    # Decimal and Fraction values are not known to json
+    return json.dumps(response, default=float)
+
+# Answer each line of input with a line of output, flushing after each so that callers can stream
+def serve_stream(parser: Parser, input, output, max_length: int = DEFAULT_MAX_LENGTH):
+    for line in input:
+        if line.strip() == "":
+            continue
+        output.write(handle_line(parser, line, max_length) + "\n")
+        output.flush()
+
+class ParseServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, parser: Parser, max_length: int = DEFAULT_MAX_LENGTH):
+        # Shared by all client threads
+        self.parser = parser
+        self.max_length = max_length
+        # Left over from a previous server; anything other than a socket is left alone, and fails to bind
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.remove(path)
+        super().__init__(path, ParseRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address) and stat.S_ISSOCK(os.stat(self.server_address).st_mode):
+            os.remove(self.server_address)
+
+    def handle_line(self, line: str) -> str:
+        return handle_line(self.parser, line, self.max_length)
+
+class ParseRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            line = line.decode("utf-8")
+            if line.strip() == "":
+                continue
+            self.wfile.write((self.server.handle_line(line) + "\n").encode("utf-8"))
+            self.wfile.flush()
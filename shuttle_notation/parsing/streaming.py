@@ -0,0 +1,105 @@
+"""
+
+    Reading of notation sources in chunks, for Parser.parse_stream().
+
+    The top level is a section of the elements separated by spaces outside of brackets. It makes one
+    pass over them for each round its slowest top level alternation needs (see analysis.first_passes()),
+    and what an element expands to in a pass only depends on how often it was expanded before, not on
+    its neighbours. Any run of complete top level elements can therefore be parsed on its own, as long
+    as it is expanded in the same pass (see LoopSequence.iteration()).
+
+    Sources are split into such runs as they are read, one per chunk or per top level element if
+    that is larger. Later passes read the source again.
+
+"""
+
+import re
+import tempfile
+
+BRACKET_PATTERN = re.compile(r"[()]")
+
+# A "/" standing on its own at the start of a run, making the whole source an alternation
+ALTERNATION_START_PATTERN = re.compile(r" */(?: |$)")
+
+def read_chunks(fileobj, chunk_size: int):
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+# Divide chunks of a source into runs of complete top level elements.
+# Brackets are matched as in tokenizer.tokenize(): a ")" with nothing to close is part of the text.
+# Anything malformed is left for build_tree() to report.
+def split_top_level(chunks):
+    depth = 0
+    pending = []
+
+    for chunk in chunks:
+        # Last space outside of brackets, which ends the complete elements of the chunk
+        last = -1
+        # Start of the current stretch outside of brackets
+        outside = 0 if depth == 0 else None
+
+        for match in BRACKET_PATTERN.finditer(chunk):
+            if match.group() == "(":
+                if depth == 0:
+                    last = max(last, chunk.rfind(" ", outside, match.start()))
+                depth += 1
+            elif depth > 0:
+                depth -= 1
+                if depth == 0:
+                    outside = match.end()
+
+        if depth == 0:
+            last = max(last, chunk.rfind(" ", outside))
+
+        if last < 0:
+            pending.append(chunk)
+            continue
+
+        pending.append(chunk[:last])
+        yield "".join(pending)
+        pending = [chunk[last + 1:]]
+
+    yield "".join(pending)
+
+def starts_with_alternation(run: str) -> bool:
+    return ALTERNATION_START_PATTERN.match(run) is not None
+
+# Chunks of a text file object that can be read again from the start.
+# Files that cannot seek (pipes, sockets) are copied to a temporary file as they are read.
+class ReplayableSource:
+    def __init__(self, fileobj, chunk_size: int):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+
+        if fileobj.seekable():
+            self.start = fileobj.tell()
+            self.copy = None
+        else:
+            # No newline translation, so that the copy reads back exactly
+            self.copy = tempfile.TemporaryFile("w+", encoding="utf-8", newline="")
+
+    # Chunks of the source from where reading left off
+    def chunks(self):
+        for chunk in read_chunks(self.fileobj, self.chunk_size):
+            if self.copy is not None:
+                self.copy.write(chunk)
+            yield chunk
+
+    # Chunks of the whole source, from the start
+    def replay(self):
+        if self.copy is None:
+            self.fileobj.seek(self.start)
+            return read_chunks(self.fileobj, self.chunk_size)
+
+        # Anything not read yet has to be copied first
+        for _ in self.chunks():
+            pass
+        self.copy.seek(0)
+        return read_chunks(self.copy, self.chunk_size)
+
+    def close(self):
+        if self.copy is not None:
+            self.copy.close()
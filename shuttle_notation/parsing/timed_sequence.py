@@ -0,0 +1,82 @@
+"""
+
+    Parsed sequence with the onset of each element, for looking up elements by time.
+
+    Onsets are the cumulative sums of the resolved "time" args, in the numeric type of the parser.
+    Elements without a time arg take no time, as in Parser.analyze().
+
+"""
+
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from decimal import Decimal
+import math
+
+from shuttle_notation.parsing.element import ResolvedElement
+
+class TimedSequence(Sequence):
+
+    # Looping sequences wrap around at the total duration when looked up by time
+    def __init__(self, elements: list[ResolvedElement], onsets: list, duration, numeric: type = Decimal, loop: bool = False):
+        self.elements = elements
+        self.onsets = onsets
+        self.duration = duration
+        self.numeric = numeric
+        self.loop = loop and duration > 0
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __getitem__(self, index):
+        return self.elements[index]
+
+    def to_numeric(self, time):
+        return time if isinstance(time, self.numeric) else self.numeric(time)
+
+    # Split a time into the number of completed loops and the time within the current one
+    def split_loop(self, time) -> tuple:
+        if not self.loop:
+            return 0, time
+        # Rounded down, also for negative times (Decimal // rounds towards zero)
+        loops = math.floor(time / self.duration)
+        return loops, time - loops * self.duration
+
+    # Element sounding at the given time, or None outside the sequence.
+    # Of elements sharing an onset, the last one is returned.
+    def element_at(self, time) -> ResolvedElement:
+        _, time = self.split_loop(self.to_numeric(time))
+        index = bisect_right(self.onsets, time) - 1
+        if index < 0 or time >= self.duration:
+            return None
+        return self.elements[index]
+
+    # First onset after the given time, or None if there is none
+    def next_onset(self, time):
+        loops, local = self.split_loop(self.to_numeric(time))
+        index = bisect_right(self.onsets, local)
+        if index < len(self.onsets):
+            return loops * self.duration + self.onsets[index]
+        if self.loop:
+            return (loops + 1) * self.duration
+        return None
+
+    # (onset, element) pairs with onsets in [start, end). Onsets of looping sequences are
+    #   given as absolute times, so a window can cover several loops.
+    def window(self, start, end) -> list[tuple]:
+        start = self.to_numeric(start)
+        end = self.to_numeric(end)
+        found = []
+        if end <= start or len(self.elements) == 0:
+            return found
+
+        loops, local = self.split_loop(start)
+        offset = loops * self.duration
+        while True:
+            low = bisect_left(self.onsets, local)
+            high = bisect_left(self.onsets, end - offset)
+            found.extend([(offset + self.onsets[i], self.elements[i]) for i in range(low, high)])
+
+            offset += self.duration
+            local = 0
+            if not self.loop or offset >= end:
+                return found
@@ -0,0 +1,76 @@
+"""
+
+    Single-pass tokenizing of notation strings, used when building the element tree.
+
+"""
+
+from dataclasses import dataclass
+from enum import Enum
+import re
+
+class TokenType(Enum):
+    ATOM = 0 # Element information, e.g. "c4:0.5"
+    OPEN = 1 # "("
+    CLOSE = 2 # ")" followed by any section information, e.g. ")*2:sus0.5"
+    ALTERNATION = 3 # "/", standing on its own
+
+# Tokens only carry offsets into the source; slice when the text is needed
+@dataclass
+class Token:
+    type: TokenType
+    start: int
+    end: int
+
+# Characters that make up atoms and section suffixes
+ATOM_PATTERN = re.compile(r"[^ ()]*")
+# At depth 0 there is no section left to close, so ")" is just part of the suffix
+# (e.g. "(a b):f)" has the suffix ":f)")
+TOP_SUFFIX_PATTERN = re.compile(r"[^ (]*")
+
+def tokenize(source_string: str):
+
+    depth = 0
+    position = 0
+    length = len(source_string)
+
+    while position < length:
+        char = source_string[position]
+
+        if char == " ":
+            position += 1
+
+        elif char == "(":
+            depth += 1
+            yield Token(TokenType.OPEN, position, position + 1)
+            position += 1
+
+        elif char == ")":
+            if depth == 0:
+                raise Exception("Malformed input - section does not start with '(' :" + source_string[:position + 1])
+
+            depth -= 1
+
+            pattern = ATOM_PATTERN if depth > 0 else TOP_SUFFIX_PATTERN
+            end = pattern.match(source_string, position + 1).end()
+
+            if end < length and source_string[end] == "(":
+                raise Exception("Malformed input - section information contains '(': " + source_string[position:end + 1])
+
+            yield Token(TokenType.CLOSE, position, end)
+            position = end
+
+        else:
+            end = ATOM_PATTERN.match(source_string, position).end()
+
+            if end < length and (source_string[end] == "(" or (source_string[end] == ")" and depth == 0)):
+                raise Exception("Malformed input - section does not start with '(' :" + source_string[position:end + 1])
+
+            if end - position == 1 and char == "/":
+                yield Token(TokenType.ALTERNATION, position, end)
+            else:
+                yield Token(TokenType.ATOM, position, end)
+
+            position = end
+
+    if depth > 0:
+        raise Exception("Malformed input - section does not have an ending ')': " + source_string)
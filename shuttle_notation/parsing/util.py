@@ -1,81 +1,152 @@
 from shuttle_notation.parsing.element import ElementType, Element
-from shuttle_notation.parsing.cursor import Cursor
-import shuttle_notation.parsing.section_parsing as section_parsing
 import shuttle_notation.parsing.information_parsing as information_parsing
+import shuttle_notation.parsing.argument_resolution as argument_resolution
 
 from decimal import Decimal
 from shuttle_notation.parsing.information_parsing import DynamicArg
-
-# "Business logic" - explain later
-def section_split(source_string) -> list:
-    cursor = Cursor(source_string)
-
-    opened_parentheses = 0
-
-    everything = []
-
-    current = ""
-
-    while not cursor.is_done():
-        match cursor.get():
-            case "(":
-                current += cursor.get()
-                opened_parentheses += 1
-            case ")":
-                current += cursor.get()
-                opened_parentheses -= 1
-            case " ":
-                if opened_parentheses == 0:
-                    if current != "":
-                        everything.append(current)
-                    current = ""
-                else:
-                    current += cursor.get()
-            case _:
-                current += cursor.get()
-        cursor.next()
-
-    if current != "":
-        everything.append(current)
-
-    return everything
+import bisect
+
+# A recorded stretch of expanded output, to be played back `repeat` times.
+# Items are atomic elements or nested blocks.
+class Block:
+    def __init__(self, items: list, repeat: int = 1):
+        self.items = items
+        self.repeat = repeat
+        # Expanded length at the start of each item, computed on first use
+        self.offsets = None
+        self.unit_length = 0
+
+    def prepare_offsets(self):
+        # Nested blocks first, so that lengths are known bottom-up without recursion
+        stack = [self]
+        order = []
+        while stack:
+            block = stack.pop()
+            if block.offsets is None:
+                order.append(block)
+                stack.extend(item for item in block.items if isinstance(item, Block))
+
+        for block in reversed(order):
+            offsets = []
+            total = 0
+            for item in block.items:
+                offsets.append(total)
+                total += len(item) if isinstance(item, Block) else 1
+            block.offsets = offsets
+            block.unit_length = total
+
+    # Expanded length of a single playback of the items
+    def __len__(self):
+        if self.offsets is None:
+            self.prepare_offsets()
+        return self.unit_length * max(self.repeat, 0)
+
+    # Atomic element at the given position of the expanded output
+    def get(self, index: int):
+        block = self
+        while True:
+            if block.offsets is None:
+                block.prepare_offsets()
+            index %= block.unit_length
+            position = bisect.bisect_right(block.offsets, index) - 1
+            item = block.items[position]
+            if not isinstance(item, Block):
+                return item
+            index -= block.offsets[position]
+            block = item
+
+# Yield the atomic elements of a block in order, without flattening it.
+# Starts at the given position of the expanded output.
+def iter_block(block: Block, start: int = 0):
+    # Frames: [block, remaining repeats, next item position]
+    stack = [[block, block.repeat, 0]]
+
+    # Descend to the start position, skipping whole repeats and items along the way
+    if start > 0:
+        if start >= len(block):
+            return
+        while True:
+            frame = stack[-1]
+            current = frame[0]
+            frame[1] -= start // current.unit_length
+            start %= current.unit_length
+            position = bisect.bisect_right(current.offsets, start) - 1
+            start -= current.offsets[position]
+            frame[2] = position + 1
+            item = current.items[position]
+            if not isinstance(item, Block):
+                yield item
+                break
+            frame[2] = position + 1
+            stack.append([item, item.repeat, 0])
+
+    while stack:
+        frame = stack[-1]
+        current = frame[0]
+        if frame[2] < len(current.items):
+            item = current.items[frame[2]]
+            frame[2] += 1
+            if isinstance(item, Block):
+                stack.append([item, item.repeat, 0])
+            else:
+                yield item
+        else:
+            frame[1] -= 1
+            frame[2] = 0
+            if frame[1] <= 0:
+                stack.pop()
 
 class TreeExpander:
 
     def __init__(self):
-        self.tick_list = []
+        # Tick counts, keyed by element identity (Element does not define __eq__)
+        self.ticks = {}
+        # Precomputed count_required_alternations() for each prepared element
+        self.required_ticks = {}
+        # Elements for which all_ticked() is known to be true
+        self.completed = set()
+        # Amount of children not yet in self.completed, per element
+        self.pending = {}
+        # Parent of each element as seen from the expanded tree
+        self.parents = {}
+
+    # Walk the tree once, caching cycle lengths and child counts for the completion tracking.
+    # Iterative to allow for nesting deeper than the recursion limit.
+    def prepare(self, element):
+
+        order = []
+        stack = [element]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            self.pending[node] = len(node.elements)
+            for child in node.elements:
+                self.parents[child] = node
+                stack.append(child)
+
+        # Children always come after their parents in order, so reverse to count bottom-up
+        for node in reversed(order):
+            if node.type == ElementType.ALTERNATION_SECTION:
+                self.required_ticks[node] = len(node.elements) \
+                    * max([self.required_ticks[child] for child in node.elements] + [1])
+            else:
+                self.required_ticks[node] = 1
 
     # Count how many times one would have to use the element to fully expand it and its children.
     def count_required_alternations(self, element):
 
-
         # NOTE: Alternations require recursive counting in case they have nested alternations.
         # Regular sections expand all-at-once and do not require multiple ticks.
-        if element.type == ElementType.ALTERNATION_SECTION:
-            # Max of [AC, 1]
-            return len(element.elements) * max([self.count_required_alternations(ele) for ele in element.elements] + [1])
+        if element not in self.required_ticks:
+            self.prepare(element)
 
-        return 1
+        return self.required_ticks[element]
 
     def all_ticked(self, element) -> bool:
-        element_ticks = self.get_ticks(element)
-
-        required_ticks = self.count_required_alternations(element) \
-            if element.type == ElementType.ALTERNATION_SECTION \
-            else 1
-
-        children_ok = True
-        for child in element.elements:
-            if not self.all_ticked(child):
-                children_ok = False
-
-        ok = element_ticks >= required_ticks and children_ok
-        return ok
+        return element in self.completed
 
     def tree_expand(self, element) -> list:
 
-        full = []
-
         # NOTE: Workaround. Parsing correctly assumes top level to be an alternation if it contains "/", but recursive logic
         #   expects top level to be a regular section.
         top_section = Element()
@@ -86,62 +157,194 @@ class TreeExpander:
 
     # Tick off an element, so that we can count how many times we have done so.
     # Alternations must be used several times to fully expand, hence the need to count.
-    def tick(self,element):
-        self.tick_list.append(element)
+    def tick(self, element):
+        ticks = self.ticks.get(element, 0) + 1
+        self.ticks[element] = ticks
+
+        # Completion only changes when the tick requirement is first met; later changes
+        #   come from children completing (see complete())
+        if ticks == self.required_ticks.get(element, 1) and self.pending.get(element, 0) == 0:
+            self.complete(element)
+
+    # Mark an element as fully ticked and propagate upwards to any parents that are now also complete.
+    def complete(self, element):
+        while element is not None and element not in self.completed:
+            self.completed.add(element)
+            parent = self.parents.get(element)
+            if parent is None:
+                break
+
+            self.pending[parent] -= 1
+            if self.pending[parent] > 0 or self.get_ticks(parent) < self.required_ticks[parent]:
+                break
+
+            element = parent
 
     # Returns how many times an element has been ticked so far.
     # Does not account for children.
     def get_ticks(self, element):
-        return len([e for e in self.tick_list if e is element])
+        return self.ticks.get(element, 0)
 
     # Expand both alternations and repeats
     def expand(self, element, repeat) -> list:
 
-        #print("EXPANDING: ", element.decompile(), " ", element.type, len(element.elements))
+        if element not in self.required_ticks:
+            self.prepare(element)
 
-        if element.type == ElementType.ATOMIC:
-            self.tick(element)
-            return duplicate([element], repeat)
-        if element.type == ElementType.SECTION:
+        output = []
 
-            # Expand all children, including ticking self until all nested alternations are done
-            flatmap = []
+        # Explicit stack instead of recursion, see push() for the frame layout
+        stack = []
+        self.push(stack, output, element, repeat)
 
-            while True:
-                self.tick(element)
-                matrix = [self.expand(e, get_repeat(e)) for e in element.elements]
-                for c in matrix:
-                    for r in c:
-                        flatmap.append(r)
+        while stack:
+            frame = stack[-1]
+            current = frame[0]
 
-                # Check after ticking, to ensure that all children are always iterated at least once
-                if self.all_ticked(element):
-                    break
+            if current.type == ElementType.SECTION:
+                position = frame[3]
+                if position < len(current.elements):
+                    # Expand all children, in order
+                    frame[3] = position + 1
+                    child = current.elements[position]
+                    self.push(stack, output, child, get_repeat(child))
 
-            # Repeat the collected flatmap afterwards, to avoid duplicate ticks
-            return duplicate(flatmap, repeat)
+                # Check after each full pass, to ensure that all children are always iterated at least once
+                elif current in self.completed:
+                    stack.pop()
 
-        if element.type == ElementType.ALTERNATION_SECTION:
+                    # Repeat the collected passes afterwards, to avoid duplicate ticks
+                    start = frame[2]
+                    if frame[1] != 1:
+                        output[start:] = output[start:] * frame[1]
+                else:
+                    # Tick self again until all nested alternations are done
+                    self.tick(current)
+                    frame[3] = 0
 
-            # Repeat the alternation as required, grabbing the next alternation each time
-            full = []
-            for i in range(0, repeat):
+            else:
+                # Alternation: grab the next alternation for each remaining repeat
+                if frame[1] <= 0:
+                    stack.pop()
+                else:
+                    frame[1] -= 1
+
+                    # Resolve an index from the tick amount (so that, in a 2-len array, 2 follows after 1, 0 after 2, etc)
+                    ticks = self.get_ticks(current)
+                    self.tick(current)
+                    child = current.elements[ticks % len(current.elements)]
+                    self.push(stack, output, child, get_repeat(child))
+
+        return output
+
+    # Lazily expanded version of tree_expand(), yielding one element at a time.
+    # Repeated sections are recorded as Blocks during their first run and then played back,
+    #   so memory use does not depend on repetition counts.
+    def iter_expand(self, element):
+        return self.walk(element, True)
+
+    # Expand the whole tree into a Block, without flattening repeats.
+    # Costs time in proportion to the tree and alternation ticks rather than the output length.
+    def block_expand(self, element) -> Block:
+        items = []
+        for _ in self.walk(element, False, items):
+            pass
+        return Block(items)
+
+    # Shared logic of iter_expand() and block_expand().
+    # Live walks yield elements; others only record them into the given top level items.
+    def walk(self, element, live: bool, items: list = None):
 
-                # Tick element and return amount of times it has been ticked
-                ticks = self.get_ticks(element)
-                self.tick(element)
-                # Resolve an index from the tick amount (so that, in a 2-len array, 2 follows after 1, 0 after 2, etc)
-                mod = ticks % (len(element.elements))
-                current_alt = element.elements[mod]
-                full += self.expand(current_alt, get_repeat(current_alt))
-            return full
+        top_section = Element()
+        top_section.type = ElementType.SECTION
+        top_section.elements = [element]
 
-        return []
+        if top_section not in self.required_ticks:
+            self.prepare(top_section)
+
+        # One list of recorded items per repeated section currently being expanded
+        recorders = [] if items is None else [items]
+        # Sections repeated 0 times still tick their children, but output nothing
+        muted = 0
+
+        # Same frame layout as in expand(), with the recorder of the section appended
+        self.tick(top_section)
+        stack = [[top_section, 1, None, 0]]
+
+        while stack:
+            frame = stack[-1]
+            current = frame[0]
+
+            if current.type == ElementType.SECTION:
+                position = frame[3]
+                if position < len(current.elements):
+                    frame[3] = position + 1
+                    child = current.elements[position]
+                    repeat = get_repeat(child)
+                elif current in self.completed:
+                    stack.pop()
+                    repeat = frame[1]
+                    if repeat != 1:
+                        block = Block(recorders.pop(), repeat)
+                        if repeat > 0:
+                            if recorders:
+                                recorders[-1].append(block)
+                            if live and muted == 0:
+                                yield from iter_block(Block(block.items, repeat - 1))
+                        else:
+                            muted -= 1
+                    continue
+                else:
+                    self.tick(current)
+                    frame[3] = 0
+                    continue
+            else:
+                if frame[1] <= 0:
+                    stack.pop()
+                    continue
+                frame[1] -= 1
+                ticks = self.get_ticks(current)
+                self.tick(current)
+                child = current.elements[ticks % len(current.elements)]
+                repeat = get_repeat(child)
+
+            # Begin expanding the child, as in push()
+            match child.type:
+                case ElementType.ATOMIC:
+                    self.tick(child)
+                    if muted == 0 and repeat > 0:
+                        if recorders:
+                            recorders[-1].append(child if repeat == 1 else Block([child], repeat))
+                        if live:
+                            for _ in range(repeat):
+                                yield child
+                case ElementType.SECTION:
+                    self.tick(child)
+                    if repeat != 1:
+                        recorders.append([])
+                        if repeat <= 0:
+                            muted += 1
+                    stack.append([child, repeat, None, 0])
+                case ElementType.ALTERNATION_SECTION:
+                    stack.append([child, repeat])
+
+    # Begin expanding an element. Atomic elements are written to output immediately.
+    # Section frames: [element, repeat, output index at start, next child position]
+    # Alternation frames: [element, remaining repeats]
+    def push(self, stack, output, element, repeat):
+        match element.type:
+            case ElementType.ATOMIC:
+                self.tick(element)
+                output.extend([element] * repeat)
+            case ElementType.SECTION:
+                self.tick(element)
+                stack.append([element, repeat, len(output), 0])
+            case ElementType.ALTERNATION_SECTION:
+                stack.append([element, repeat])
 
 # Returns the amount of times an element should be repeated, according to its "xN" suffix
 def get_repeat(element) -> int:
-    information = information_parsing.divide_information(element)
-    return information.repetition
+    return information_parsing.get_information(element).repetition
 
 # Returns a flat list containing elements copied N times.
 def duplicate(elements, times):
@@ -156,8 +359,17 @@ def get_information_history(element) -> list:
     full_list = []
     current_element = element
     while current_element != None:
-        info = information_parsing.divide_information(current_element)
-        full_list.append(info)
+        full_list.append(information_parsing.get_information(current_element))
+        current_element = current_element.parent
+
+    return full_list
+
+# Get the parsed args of the element and all its parents, in that order
+def get_argument_history(element) -> list:
+    full_list = []
+    current_element = element
+    while current_element != None:
+        full_list.append(information_parsing.get_args(current_element))
         current_element = current_element.parent
 
     return full_list
@@ -179,18 +391,30 @@ def get_information_history(element) -> list:
 def resolve_full_arguments(
     information_history: list, # todo: strong typing
     default_args: dict,
-    arg_aliases: dict
+    arg_aliases: dict,
+    numeric: type = Decimal
 ) -> dict[str, Decimal]:
 
+    arg_history = [
+        information_parsing.parse_args(info.arg_source, arg_aliases, numeric)
+        for info in information_history if info.arg_source != ""
+    ]
+
+    return resolve_arguments(arg_history, default_args, numeric)
+
+# As resolve_full_arguments(), but for args already parsed from each information source.
+# Default values are converted to the given numeric type, which should match that of the parsed args.
+def resolve_arguments(
+    arg_history: list[dict[str, DynamicArg]],
+    default_args: dict,
+    numeric: type = Decimal
+) -> dict[str, Decimal]:
 
     # Value of args per element in historical order, bottom to top
     per_arg_history: dict[str, list[DynamicArg]] = {}
 
-    arg_source_history: list[str] = [info.arg_source for info in information_history if info.arg_source != ""]
-
     # History starts with the current element; later entries represent parents
-    for source in arg_source_history:
-        args: dict[str, DynamicArg] = information_parsing.parse_args(source, arg_aliases)
+    for args in arg_history:
 
         # Build histories for each available arg
         for arg_name in args:
@@ -201,7 +425,7 @@ def resolve_full_arguments(
 
     # Append default args as topmost parent
     for arg_name in default_args:
-        arg_value = information_parsing.DynamicArg(Decimal(default_args[arg_name]))
+        arg_value = information_parsing.DynamicArg(numeric(default_args[arg_name]))
 
         if arg_name not in per_arg_history:
             per_arg_history[arg_name] = [arg_value]
@@ -214,132 +438,47 @@ def resolve_full_arguments(
     resolved_args: dict[str, Decimal] = {}
 
     def resolve_arg_history(arg_name: str, top_down_history: list[DynamicArg]):
-
-        other_arg_references = [arg.other_arg_reference for arg in top_down_history if arg.other_arg_reference != ""]
-
-        # Skip args with unresovlable references in their history
-        can_process = True
-        for ref_arg_name in other_arg_references:
-            if ref_arg_name not in resolved_args:
-                can_process = False
-
-        if can_process:
-            for history_arg in top_down_history:
-
-                # First check if value should refer to another
-                if history_arg.other_arg_reference != "":
-
-                    print("REFERENCE YO", history_arg.other_arg_reference)
-                    # Reference the final resolved value of the other arg
-                    other_arg_value = resolved_args[history_arg.other_arg_reference]
-
-                    # E.g. sus0.5time
-                    modified_value = history_arg.value * other_arg_value
-
-                    resolved_args[arg_name] = modified_value
-
-                # Reasoning: Args must have a previous value to be modified by operators
-                elif arg_name in resolved_args:
-                    match history_arg.operator:
-                        case "*":
-                            resolved_args[arg_name] *= history_arg.value
-                        case "+":
-                            resolved_args[arg_name] += history_arg.value
-                        case "-":
-                            resolved_args[arg_name] *= history_arg.value
-                        case _:
-                            # Blank or unknown operator should overwrite
-                            resolved_args[arg_name] = history_arg.value
-                else:
-                    # Introduce without any operators if no higher level version exists
-
-                    # Note that a negation operator can also just mean a flat negative
-                    flat_value = history_arg.value * -1 if history_arg.operator == "-" else history_arg.value
-                    resolved_args[arg_name] = flat_value
-
-    # First pass: resolve args with no references
-    for arg_name in per_arg_history:
-            # Reverse the order so that we start with the "oldest" parent args
-            per_arg_history[arg_name].reverse()
-            resolve_arg_history(arg_name, per_arg_history[arg_name])
-
-    # Second pass: resolve rest of args (hopefully)
-    for arg_name in per_arg_history:
-        if arg_name not in resolved_args:
-            # Already reversed
-            resolve_arg_history(arg_name, per_arg_history[arg_name])
-
-    unresolved_args = [arg_name for arg_name in per_arg_history if arg_name not in resolved_args]
-    if len(unresolved_args) > 0:
-        print("ERROR: Some args could not resolve, circular references?", unresolved_args)
-        exit(1)
-
-    return resolved_args
-
-
-# TODO: Delete after we are fully confident in the new method
-def resolve_full_arguments_old(
-    information_history: list,
-    default_args: dict = {}, # {str:Decimal}, treated as topmost args
-    arg_aliases: dict = {} # {str:str}, see parse_args()
-) -> dict:
-
-
-    all_arg_dicts = []
-
-    # Walk to the top parent, collecting all argument dicts along the way.
-    for info in information_history:
-        if info.arg_source != "":
-            args = information_parsing.parse_args(info.arg_source, arg_aliases)
-            all_arg_dicts.append(args)
-
-    # Append the default args as root
-    dyn_default_args = {}
-    for key in default_args:
-        dyn_default_args[key] = information_parsing.DynamicArg(Decimal(default_args[key]))
-    all_arg_dicts.append(dyn_default_args)
-
-    # Reverse priority order; begin with topmost/root args and process bottom/note-specific args last.
-    all_arg_dicts.reverse()
-
-    # Non-dynamic args; dict of <str,Decimal>
-    resolved_args = {}
-
-    for arg_dict in all_arg_dicts:
-        for dynamic_arg_key in arg_dict:
-            dynamic_arg = arg_dict[dynamic_arg_key]
-            # Arg not referencing other arg (do those on second pass-through)
-            if dynamic_arg.other_arg_reference == "":
-                # Reasoning: Arg present at a higher level and can be modified
-                if dynamic_arg_key in resolved_args:
-                    match dynamic_arg.operator:
-                        case "*":
-                            resolved_args[dynamic_arg_key] *= dynamic_arg.value
-                        case "+":
-                            resolved_args[dynamic_arg_key] += dynamic_arg.value
-                        case "-":
-                            resolved_args[dynamic_arg_key] *= dynamic_arg.value
-                        case _:
-                            # Blank or unknown operator should overwrite
-                            resolved_args[dynamic_arg_key] = dynamic_arg.value
-                else:
-                    # Introduce without any operators if no higher level version exists
-
-                    # Note that a negation operator can also just mean a flat negative
-                    flat_value = dynamic_arg.value * -1 if dynamic_arg.operator == "-" else dynamic_arg.value
-                    resolved_args[dynamic_arg_key] = flat_value
-
-    # Second pass: Only process reference args
-    for arg_dict in all_arg_dicts:
-        for dynamic_arg_key in arg_dict:
-            dynamic_arg = arg_dict[dynamic_arg_key]
-            # Arg has a reference to another arg value that has been registered
-            if dynamic_arg.other_arg_reference != "" and dynamic_arg.other_arg_reference in resolved_args:
-
-                """
-                    Note: referencing currently ignores operators as that's a whole other bag of worms.
-                        - sus1.0time always means "sus should be (1.0 * the resolved value of time)"
-                """
-                resolved_args[dynamic_arg_key] = resolved_args[dynamic_arg.other_arg_reference] * dynamic_arg.value
+        for history_arg in top_down_history:
+
+            # First check if value should refer to another
+            if history_arg.other_arg_reference != "":
+
+                # Reference the final resolved value of the other arg
+                other_arg_value = resolved_args[history_arg.other_arg_reference]
+
+                # E.g. sus0.5time
+                modified_value = history_arg.value * other_arg_value
+
+                resolved_args[arg_name] = modified_value
+
+            # Reasoning: Args must have a previous value to be modified by operators
+            elif arg_name in resolved_args:
+                match history_arg.operator:
+                    case "*":
+                        resolved_args[arg_name] *= history_arg.value
+                    case "+":
+                        resolved_args[arg_name] += history_arg.value
+                    case "-":
+                        resolved_args[arg_name] *= history_arg.value
+                    case _:
+                        # Blank or unknown operator should overwrite
+                        resolved_args[arg_name] = history_arg.value
+            else:
+                # Introduce without any operators if no higher level version exists
+
+                # Note that a negation operator can also just mean a flat negative
+                flat_value = history_arg.value * -1 if history_arg.operator == "-" else history_arg.value
+                resolved_args[arg_name] = flat_value
+
+    # Args are resolved after everything referenced anywhere in their history,
+    #   see argument_resolution.resolution_order()
+    layout = tuple([
+        (arg_name, frozenset([arg.other_arg_reference for arg in per_arg_history[arg_name] if arg.other_arg_reference != ""]))
+        for arg_name in per_arg_history
+    ])
+    for arg_name in argument_resolution.resolution_order(layout):
+        # Reverse the order so that we start with the "oldest" parent args
+        per_arg_history[arg_name].reverse()
+        resolve_arg_history(arg_name, per_arg_history[arg_name])
 
     return resolved_args
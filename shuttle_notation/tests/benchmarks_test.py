@@ -0,0 +1,31 @@
+from shuttle_notation.benchmarks import corpora, suite
+from shuttle_notation.parsing.full_parse import Parser
+
+def test_corpora_parse():
+    parser = Parser(cache_size = 0)
+    parser.arg_defaults = {"time": 1}
+    for name, source in corpora.generate(0.01).items():
+        assert len(parser.parse(source)) > 0, name
+
+def test_suite_smoke(tmp_path):
+    results = suite.run(scale = 0.01, repeats = 1)
+    assert set(results) == set(corpora.CORPORA) | {suite.CALIBRATION}
+    for corpus, stages in results.items():
+        if corpus == suite.CALIBRATION:
+            continue
+        assert set(stages) == {"build_tree", "tree_expand", "resolve", "parse"}
+
+    path = str(tmp_path / "results.json")
+    suite.save(results, path)
+    assert suite.load(path) == results
+
+def test_compare():
+    baseline = {"long_flat": {"parse": 0.1, "resolve": 0.001}}
+    results = {"long_flat": {"parse": 0.2, "resolve": 0.002}, "new_corpus": {"parse": 1.0}}
+    # Only regressions that are both relatively and absolutely large are reported
+    assert suite.compare(results, baseline) == [("long_flat", "parse", 0.1, 0.2)]
+
+    # Baselines are scaled by the relative speed of the machine
+    baseline[suite.CALIBRATION] = {"loop": 1.0}
+    results[suite.CALIBRATION] = {"loop": 2.0}
+    assert suite.compare(results, baseline) == []
@@ -1,4 +1,6 @@
 from full_parse import *
+import math
+import pytest
 
 def test_all():
     # Test aliases and defaults
@@ -14,3 +16,617 @@ def test_all():
 
     res = parser.parse("(c4:sus*0.5):2.0,sus1time")
     assert res[0].args["sus"] == Decimal("1.0"), "sus failed"
+
+def test_matches_per_leaf_resolution():
+    import random
+    import re
+    from shuttle_notation.tests.util_test import random_source
+    import util
+
+    rng = random.Random(3)
+    parser = Parser()
+    parser.arg_aliases = {">": "sus"}
+    parser.arg_defaults = {"sus": Decimal("1.0"), "time": Decimal("0.5"), "amp": Decimal("1")}
+    arg_choices = ["", ":0.25", ":>*2", ":amp0.5,>+0.1", ":amp-0.3", ":time2sus", ":amp*2,>-1", ":=3", ":time*2,>1.5"]
+
+    for _ in range(200):
+        # Sprinkle args over both atoms and sections
+        source = random_source(rng)
+        source = re.sub(r"(\)|[0-9])(\*[0-9])?", lambda m: m.group(0) + rng.choice(arg_choices), source)
+        tree = section_parsing.build_tree(source, parser.arg_aliases)
+        sequence = util.TreeExpander().tree_expand(tree)
+        expected = [parser.resolve(e) for e in sequence]
+        assert parser.parse(source) == expected, source
+
+def test_reference_chains():
+    parser = Parser()
+    parser.arg_defaults = {"time": Decimal("0.5")}
+
+    # Each arg doubles the previous one, written in reverse so that no fixed number of passes suffices
+    names = [first + second for first in "bcdefg" for second in "xyz"]
+    chain = [names[0] + "2time"] + [names[i] + "2" + names[i - 1] for i in range(1, len(names))]
+    source = "a1:" + ",".join(reversed(chain))
+    args = parser.parse(source)[0].args
+    for i, name in enumerate(names):
+        assert args[name] == Decimal(2 ** i), name
+
+    # Also through sections, and for per-leaf resolution
+    source = "(a1:" + ",".join(reversed(chain[:9])) + "):" + ",".join(reversed(chain[9:]))
+    element = util.TreeExpander().tree_expand(section_parsing.build_tree(source))[0]
+    assert parser.parse(source)[0].args == parser.resolve(element).args == args
+
+    with pytest.raises(argument_resolution.ReferenceCycleError) as error:
+        parser.parse("a1:sus1amp,amp2time,time1sus")
+    assert error.value.cycle == ["sus", "amp", "time", "sus"]
+    assert "sus -> amp -> time -> sus" in str(error.value)
+
+    with pytest.raises(argument_resolution.ReferenceCycleError):
+        parser.resolve(util.TreeExpander().tree_expand(section_parsing.build_tree("(a1:sus1amp):amp2sus"))[0])
+
+    with pytest.raises(argument_resolution.ArgReferenceError, match="unknown arg 'nothing'"):
+        parser.parse("a1:sus2nothing")
+
+def test_iter_parse():
+    import itertools
+    parser = Parser()
+    parser.arg_defaults = {"time": Decimal("0.5")}
+
+    source = "(a1 (b2 / c3:2 / d4))*3:amp0.5 e5"
+    assert list(parser.iter_parse(source)) == parser.parse(source)
+
+    # Far too many elements to expand eagerly
+    first = list(itertools.islice(parser.iter_parse("(a1 (b2 / c3 / d4))*100000000"), 7))
+    assert [e.to_str() for e in first] == ["a1:time0.5", "b2:time0.5", "a1:time0.5", "c3:time0.5", "a1:time0.5", "d4:time0.5", "a1:time0.5"]
+
+def test_parse_view():
+    import random
+    from shuttle_notation.tests.util_test import random_source
+
+    rng = random.Random(5)
+    parser = Parser()
+    sources = ["a1*0 b2", "(a1 (b2 / c3)*2)*3 d4*4", "((a1 b2*2)*3 c3)*2"] + [random_source(rng) for _ in range(200)]
+    for source in sources:
+        expected = parser.parse(source)
+        view = parser.parse_view(source)
+        assert len(view) == len(expected), source
+        assert list(view) == expected, source
+        for i in range(-len(expected), len(expected)):
+            assert view[i] == expected[i], source
+        for start in range(len(expected) + 1):
+            assert view[start:start + 5] == expected[start:start + 5], source
+        assert view[::3] == expected[::3], source
+
+    # Seek into a sequence far too long to expand
+    view = parser.parse_view("(a1 (b2 / c3)*2 (d4 e5*3)*1000)*1000000")
+    assert len(view) == 1000000 * (1 + 2 + 4000)
+    assert view[-1].to_str() == "e5"
+    assert [e.to_str() for e in view[4002:4005]] == ["e5", "a1", "b2"]
+
+def test_cache():
+    parser = Parser(cache_size = 2)
+    parser.arg_defaults = {"sus": Decimal("1.0")}
+
+    first = parser.parse("a1 b2")
+    assert parser.parse("  a1   b2 ") == first
+    assert parser.cache_info().hits == 1
+    assert parser.cache_info().misses == 1
+
+    # Cached results can not be modified through what is handed out
+    with pytest.raises(TypeError):
+        first[0].args["sus"] = Decimal("9")
+    first.clear()
+    assert parser.parse("a1 b2")[0].args["sus"] == Decimal("1.0")
+
+    # Configuration is part of the key, including changes made in place
+    parser.arg_defaults["sus"] = Decimal("2.0")
+    assert parser.parse("a1 b2")[0].args["sus"] == Decimal("2.0")
+    parser.arg_aliases = {">": "sus"}
+    assert parser.parse("a1:>0.5 b2")[0].args["sus"] == Decimal("0.5")
+
+    info = parser.cache_info()
+    assert info.hits == 2
+    assert info.misses == 3
+    assert info.evictions == 1
+    assert info.size == 2
+
+    # Defaults that compare equal but are written differently are not mixed up
+    parser.arg_aliases = {}
+    parser.arg_defaults = {"sus": Decimal("1.0")}
+    assert parser.parse("c1")[0].to_str() == "c1:sus1.0"
+    parser.arg_defaults = {"sus": Decimal("1")}
+    assert parser.parse("c1")[0].to_str() == "c1:sus1"
+
+def test_copy_results():
+    import pickle, copy, dataclasses
+    parser = Parser()
+    parser.arg_defaults = {"sus": Decimal("1.0")}
+
+    # Results can be pickled and copied, and the copies stay read-only
+    result = parser.parse("a1:amp2 b2")
+    for duplicate in [pickle.loads(pickle.dumps(result)), copy.deepcopy(result), copy.copy(result)]:
+        assert duplicate == result
+        assert [e.to_str() for e in duplicate] == [e.to_str() for e in result]
+        with pytest.raises(TypeError):
+            duplicate[0].args["sus"] = Decimal("9")
+    assert dataclasses.asdict(result[0])["args"] == {"sus": Decimal("1.0"), "amp": Decimal("2")}
+
+    # Elements resolved one at a time share the same kind of map
+    single = parser.resolve(section_parsing.build_tree("a1:amp2").elements[0])
+    assert single == result[0] and type(single.args) is type(result[0].args)
+
+def test_reparse():
+    import random
+    from shuttle_notation.tests.util_test import random_source
+    from tokenizer import tokenize, TokenType
+
+    rng = random.Random(6)
+    parser = Parser(cache_size = 0)
+    parser.arg_defaults = {"time": Decimal("0.5")}
+
+    for _ in range(30):
+        source = "(" + random_source(rng) + "):amp0.5 " + random_source(rng)
+        result = parser.reparse(None, source)
+        for _ in range(10):
+            # Replace a random atom with a new element or section
+            atoms = [t for t in tokenize(source) if t.type == TokenType.ATOM]
+            atom = rng.choice(atoms)
+            replacement = rng.choice(["x1:2", "(y2 / z3)", "(w4 " + random_source(rng, 1) + "):sus2"])
+            source = source[:atom.start] + replacement + source[atom.end:]
+
+            result = parser.reparse(result, source)
+            assert result.elements == parser.parse(source), source
+
+    # Unchanged sections are reused as-is
+    first = parser.reparse(None, "(a1 (b2 / c3)):amp0.5 d4")
+    first_section = first.tree.elements[0]
+    second = parser.reparse(first, "(a1 (b2 / c3)):amp0.5 e5")
+    assert second.tree.elements[0] is first_section
+    assert second.resolved[first_section.elements[0]] is first.resolved[first_section.elements[0]]
+
+    # Defaults written differently are a different configuration, even when equal
+    parser.arg_defaults = {"time": Decimal("1.0")}
+    first = parser.reparse(None, "(a1 b2) c3")
+    parser.arg_defaults = {"time": Decimal("1")}
+    assert [e.to_str() for e in parser.reparse(first, "(a1 b2) c3").elements] == ["a1:time1", "b2:time1", "c3:time1"]
+
+    # The same goes for args handed down to reused sections
+    first = parser.reparse(None, "((a1) b2):amp1.0")
+    second = parser.reparse(first, "((a1) b2):amp1")
+    assert [e.to_str() for e in second.elements] == [e.to_str() for e in parser.parse("((a1) b2):amp1")]
+
+def test_parse_many():
+    parser = Parser()
+    parser.arg_aliases = {">": "sus"}
+    parser.arg_defaults = {"sus": Decimal("1.0")}
+    sources = ["a1:>0.5 (b2 / c3)*2", "(d4 e5:amp0.2)*3:0.25", "f6"] * 4
+
+    expected = [parser.parse(source) for source in sources]
+    assert parser.parse_many(sources) == expected
+    assert parser.parse_many(sources, workers = 2, min_batch = 0) == expected
+
+def test_numeric_backends():
+    from fractions import Fraction
+    source = "(a1:amp0.1,sus*3 b2:time2sus):0.5,sus+0.2"
+
+    decimal_parser = Parser(numeric = Decimal)
+    decimal_parser.arg_defaults = {"sus": Decimal("0.1")}
+    expected = decimal_parser.parse(source)
+
+    for numeric in [float, Fraction]:
+        parser = Parser(numeric = numeric)
+        parser.arg_defaults = {"sus": Decimal("0.1")}
+        result = parser.parse(source)
+        for element, expected_element in zip(result, expected):
+            assert list(element.args) == list(expected_element.args)
+            for name in element.args:
+                assert type(element.args[name]) is numeric
+                assert abs(Decimal(float(element.args[name])) - expected_element.args[name]) < Decimal("1e-9")
+        assert list(parser.iter_parse(source)) == result
+
+        # Resolving leaf by leaf follows the numeric type too
+        top_element = section_parsing.build_tree(source, parser.arg_aliases, numeric)
+        config = parser.config()
+        resolved = [parser.resolve(e, config) for e in util.TreeExpander().tree_expand(top_element)]
+        assert [dict(e.args) for e in resolved] == [dict(e.args) for e in result]
+        assert all([type(value) is numeric for e in resolved for value in e.args.values()])
+
+    # Exact, unlike float
+    assert Parser(numeric = Fraction).parse("(a:amp+0.2):amp0.1")[0].args["amp"] == Fraction(3, 10)
+
+def test_parse_columnar():
+    from array import array
+    source = "x1:amp0.5,sus2 (y2 / z3:0.25)*2 x1 4"
+
+    parser = Parser()
+    columnar = parser.parse_columnar(source)
+    expected = parser.parse(source)
+    assert len(columnar) == len(expected)
+    assert columnar.to_elements() == expected
+    assert list(columnar.index) == [1, 2, 3, 1, 4]
+    assert [columnar.prefixes[i] for i in columnar.prefix_ids] == ["x", "y", "z", "x", ""]
+    assert columnar.column("time") == [None, None, Decimal("0.25"), None, None]
+    assert list(columnar.present["amp"]) == [1, 0, 0, 0, 0]
+
+    float_columnar = Parser(numeric = float).parse_columnar(source)
+    assert isinstance(float_columnar.columns["amp"], array)
+    assert float_columnar.to_elements() == Parser(numeric = float).parse(source)
+
+def test_shared_args():
+    result = Parser().parse("a1:amp0.5 b2:amp0.5 (c3 d4):amp0.5 e5:amp0.50")
+    assert result[0].args is result[1].args
+    assert result[0].args is result[2].args
+    # Equal values written differently stay apart
+    assert result[4].to_str() == "e5:amp0.50"
+
+    with pytest.raises(Exception):
+        result[0].index = 3
+    with pytest.raises(AttributeError):
+        Element().extra = 1
+
+def test_profiling():
+    parser = Parser()
+    parser.arg_defaults = {"time": Decimal("1.0"), "amp": Decimal("1.0")}
+    source = "a1:amp0.5 (b2 / c3)*2 (d4 e5):0.5"
+    expected = parser.parse(source)
+    assert parser.last_stats is None
+
+    reported = []
+    parser.profile = True
+    parser.on_stats = reported.append
+    parser.clear_cache()
+
+    assert parser.parse(source) == expected
+    stats = parser.last_stats
+    assert reported == [stats]
+
+    # Top section, 2 subsections and 5 leaves, each divided once
+    assert stats.nodes_built == 8
+    assert stats.divide_information_calls == 8
+    assert stats.parse_args_calls == 2
+    assert stats.leaves_resolved == 5
+    assert stats.ticks > 0
+    assert stats.cache_hits == 0
+    assert stats.total_seconds >= stats.build_seconds + stats.expand_seconds + stats.resolve_seconds
+
+    parser.parse(source)
+    assert parser.last_stats.cache_hits == 1
+    assert parser.last_stats.nodes_built == 0
+    assert len(reported) == 2
+
+    # Counting stops with the parse
+    parser.profile = False
+    parser.parse("f6")
+    assert len(reported) == 2
+
+def test_analyze():
+    import random
+    from collections import Counter
+    from shuttle_notation.tests.util_test import random_source
+    import analysis
+    import util
+
+    parser = Parser()
+    parser.arg_defaults = {"time": Decimal("0.5")}
+
+    rng = random.Random(3)
+    sources = [random_source(rng) for _ in range(100)] + [
+        "(a b:2)*0 c*3:0.25 (d / (e f)*0)",
+        "(a (b / c):2)*3 (x / (y / z)*2)*2",
+        "t / (a / b)*3",
+    ]
+    for source in sources:
+        # Per-leaf counts match real expansion
+        top_element = section_parsing.build_tree(source)
+        counts = analysis.count_leaves(top_element)
+        expanded = Counter(util.TreeExpander().tree_expand(top_element))
+        assert {e: c for e, c in counts.items() if c > 0} == dict(expanded), source
+
+        result = parser.analyze(source)
+        elements = parser.parse(source)
+        assert result.length == len(elements), source
+        assert result.duration == sum([e.args["time"] for e in elements]), source
+        assert result.memory_bytes > 8 * len(elements)
+
+    # Sizes far beyond what could be expanded: 2 passes for the alternation, each of 200001 elements
+    assert len(parser.parse("((a b)*100 (c / d))*100")) == 2 * 201 * 100
+    assert parser.analyze("((a b)*100000 (c / d))*100000").length == 2 * 200001 * 100000
+
+    with pytest.raises(Exception):
+        parser.analyze("a (b / c)*0")
+
+def test_compile():
+    import random
+    import re
+    from shuttle_notation.tests.util_test import random_source
+
+    rng = random.Random(5)
+    parser = Parser()
+    arg_choices = ["", ":0.25", ":>*2", ":amp0.5,>+0.1", ":amp-0.3", ":time2sus", ":amp*2,>-1", ":=3", ":time*2,>1.5"]
+    configurations = [
+        ({"sus": Decimal("1.0"), "time": Decimal("0.5"), "amp": Decimal("1")}, {">": "sus"}),
+        ({"sus": Decimal("2.0"), "time": Decimal("0.5"), "amp": Decimal("1")}, {">": "sus"}),
+        ({"sus": Decimal("2.0"), "time": Decimal("0.25"), "amp": Decimal("1")}, {">": "sus"}),
+        ({"sus": Decimal("2.0"), "time": Decimal("0.25"), "amp": Decimal("3")}, {">": "amp", "sus": "time"}),
+        ({"time": Decimal("1"), "sus": Decimal("1.0"), "amp": Decimal("3")}, {">": "sus"}),
+    ]
+
+    for _ in range(50):
+        source = random_source(rng)
+        source = re.sub(r"(\)|[0-9])(\*[0-9])?", lambda m: m.group(0) + rng.choice(arg_choices), source)
+
+        parser.arg_defaults, parser.arg_aliases = configurations[0]
+        compiled = parser.compile(source)
+        assert compiled.resolve() == parser.parse(source), source
+
+        for defaults, aliases in configurations:
+            parser.arg_defaults, parser.arg_aliases = defaults, aliases
+            assert compiled.resolve(defaults, aliases) == parser.parse(source), source
+
+    # Only leaves depending on a changed default are resolved again
+    parser.arg_defaults = {"sus": Decimal("1"), "time": Decimal("1")}
+    parser.arg_aliases = {}
+    compiled = parser.compile("a1:sus2 b2:sus*2 c3:sus1time (d4 e5):time0.5,sus3")
+    first = compiled.resolve()
+    assert sorted(compiled.dependents) == ["sus", "time"]
+    assert sorted([e.information for e in compiled.dependents["sus"]]) == ["b2:sus*2"]
+    assert sorted([e.information for e in compiled.dependents["time"]]) == ["a1:sus2", "b2:sus*2", "c3:sus1time"]
+
+    second = compiled.resolve({"sus": Decimal("4"), "time": Decimal("1")})
+    assert [e.args["sus"] for e in second] == [2, 8, 1, 3, 3]
+    assert [a is b for a, b in zip(first, second)] == [True, False, True, True, True]
+
+    # An alias merging with the arg it stands for resolves as in parse()
+    parser.arg_aliases = {"b": "amp"}
+    compiled = parser.compile("6s:b0.25,amp*0.5,b0.25")
+    assert compiled.resolve()[0].args["amp"] == parser.parse("6s:b0.25,amp*0.5,b0.25")[0].args["amp"] == Decimal("0.25")
+    parser.arg_aliases = {}
+
+    # A failed resolve leaves the previous state in place
+    compiled = parser.compile("s1:time2.0sus")
+    assert compiled.resolve()[0].args["time"] == 2
+    with pytest.raises(argument_resolution.ArgReferenceError):
+        compiled.resolve({"time": Decimal("1")})
+    assert compiled.resolve({"sus": Decimal("3"), "time": Decimal("1")})[0].args["time"] == 6
+
+def test_parse_timed():
+    import random
+    from fractions import Fraction
+    from shuttle_notation.tests.util_test import random_source
+
+    parser = Parser()
+    parser.arg_defaults = {"time": Decimal("0.25")}
+    timed = parser.parse_timed("a1 b2:1 c3:0.5 (d4 e5):0 f6:2")
+    assert list(timed) == parser.parse("a1 b2:1 c3:0.5 (d4 e5):0 f6:2")
+    assert timed.onsets == [0, Decimal("0.25"), Decimal("1.25"), Decimal("1.75"), Decimal("1.75"), Decimal("1.75")]
+    assert timed.duration == Decimal("3.75")
+
+    assert timed.element_at(0).prefix == "a"
+    assert timed.element_at(1).prefix == "b"
+    assert timed.element_at(1.25).prefix == "c"
+    # Zero length elements share the onset of the next one, which is the one sounding
+    assert timed.element_at(1.75).prefix == "f"
+    assert timed.element_at(3.75) is None
+    assert timed.element_at(-1) is None
+
+    assert timed.next_onset(0) == Decimal("0.25")
+    assert timed.next_onset(1.5) == Decimal("1.75")
+    assert timed.next_onset(2) is None
+
+    assert [e.prefix for _, e in timed.window(0.25, 1.75)] == ["b", "c"]
+    assert [e.prefix for _, e in timed.window(1.75, 10)] == ["d", "e", "f"]
+
+    looped = parser.parse_timed("a1 b2:1 c3:0.5 (d4 e5):0 f6:2", loop = True)
+    assert looped.element_at(Decimal("3.75") * 10 + 1).prefix == "b"
+    assert looped.element_at(-2.25).prefix == "c"
+    assert looped.next_onset(Decimal("3.8")) == Decimal("4.0")
+    assert looped.next_onset(3) == Decimal("3.75")
+    window = looped.window(3, 8)
+    assert [(onset, e.prefix) for onset, e in window] == [
+        (Decimal("3.75"), "a"), (Decimal("4.00"), "b"), (Decimal("5.00"), "c"),
+        (Decimal("5.50"), "d"), (Decimal("5.50"), "e"), (Decimal("5.50"), "f"), (Decimal("7.50"), "a"), (Decimal("7.75"), "b")
+    ]
+
+    # Lookups agree with a linear scan over random sequences
+    rng = random.Random(9)
+    for numeric in [Decimal, float, Fraction]:
+        parser = Parser(numeric = numeric)
+        parser.arg_defaults = {"time": 1}
+        for _ in range(20):
+            source = random_source(rng) + ":0.5"
+            timed = parser.parse_timed(source, loop = True)
+            assert list(timed) == parser.parse(source)
+            for _ in range(20):
+                time = numeric(rng.randint(-40, 400)) / 8
+                local = time % timed.duration if numeric is not Decimal else time - math.floor(time / timed.duration) * timed.duration
+                onset = 0
+                expected = None
+                for element in timed:
+                    if onset <= local:
+                        expected = element
+                    onset += element.args["time"]
+                assert timed.element_at(time) is expected
+
+def test_parse_loop():
+    parser = Parser()
+    parser.arg_defaults = {"time": Decimal("1")}
+    loop = parser.parse_loop("c1:0.5 (d2 / e3 / f4)")
+    assert [e.to_str() for e in loop.step()] == ["c1:time0.5", "d2:time1"]
+    assert [e.to_str() for e in loop.iteration(5)] == ["c1:time0.5", "f4:time1"]
+    assert loop.step() + loop.step() == parser.parse("c1:0.5 (d2 / e3 / f4)")[2:]
+
+def test_serialization(tmp_path):
+    import random
+    import re
+    from fractions import Fraction
+    from shuttle_notation.tests.util_test import random_source
+    import serialization
+
+    rng = random.Random(13)
+    arg_choices = ["", ":0.25", ":amp0.5,sus+0.1", ":amp-0.3", ":time2sus", ":=3"]
+    for numeric in [Decimal, float, Fraction]:
+        parser = Parser(numeric = numeric)
+        parser.arg_defaults = {"sus": 1, "time": 1, "amp": 1}
+        for i in range(20):
+            source = random_source(rng).replace("a", "ä")
+            source = re.sub(r"(\)|[0-9])(\*[0-9])?", lambda m: m.group(0) + rng.choice(arg_choices), source)
+            expected = parser.parse(source)
+
+            path = tmp_path / (numeric.__name__ + str(i))
+            with open(path, "wb") as file:
+                serialization.dump(expected, numeric, file)
+            loaded, loaded_numeric = serialization.load(path)
+
+            assert loaded_numeric is numeric
+            assert loaded == expected, source
+            assert [type(v) for e in loaded for v in e.args.values()] == [type(v) for e in expected for v in e.args.values()]
+            # Repeated elements stay shared
+            assert len(set(map(id, loaded))) == len(set(map(id, expected)))
+
+    # Results are kept between parsers using the same directory
+    source = "(c1:amp0.5 (d2 / e3))*40 f4:0.25"
+    first = Parser(cache_directory = str(tmp_path / "cache"))
+    expected = first.parse(source)
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+    second = Parser(cache_directory = str(tmp_path / "cache"))
+    second.parse_uncached = None
+    assert second.parse(source) == expected
+
+    # Other configurations do not share files
+    second.arg_defaults = {"amp": 1}
+    del second.parse_uncached
+    assert second.parse(source) != expected
+    assert len(list((tmp_path / "cache").iterdir())) == 2
+
+    # Damaged files are parsed again and rewritten
+    for damage in [lambda data: data[:len(data) // 2], lambda data: b"", lambda data: data[:8] + b"\xff" * (len(data) - 8)]:
+        path = first.disk_cache.path((normalize_source(source), (), (), Decimal))
+        with open(path, "rb") as file:
+            data = file.read()
+        with open(path, "wb") as file:
+            file.write(damage(data))
+        third = Parser(cache_directory = str(tmp_path / "cache"))
+        assert third.parse(source) == expected
+        assert third.disk_cache.load((normalize_source(source), (), (), Decimal)) == expected
+
+    # Numeric types that files cannot record are not cached on disk
+    class Scaled(Decimal):
+        pass
+    custom = Parser(numeric = Scaled, cache_directory = str(tmp_path / "custom"))
+    assert custom.parse("a1:0.5")[0].args["time"] == Decimal("0.5")
+    assert list((tmp_path / "custom").iterdir()) == []
+
+@pytest.fixture
+def large_source_file(tmp_path):
+    import random
+    from shuttle_notation.tests.util_test import random_source
+
+    # Bracketed, so that only the few explicit top level alternations need extra passes
+    rng = random.Random(17)
+    parts = ["(" + random_source(rng) + ")" + rng.choice(["", "*2", ":0.5", ":sus2time"]) for _ in range(1000)]
+    for index in range(0, len(parts), 200):
+        parts[index] = "(a1 / b2:0.5 / c3)"
+
+    path = tmp_path / "large.shn"
+    path.write_text(" ".join(parts), encoding="utf-8")
+    return path
+
+def test_parse_stream(large_source_file):
+    import io
+    import random
+    from shuttle_notation.tests.util_test import random_source
+
+    parser = Parser(cache_size = 0)
+    parser.arg_defaults = {"time": Decimal("0.25")}
+
+    expected = parser.parse(large_source_file.read_text(encoding="utf-8"))
+    with open(large_source_file, encoding="utf-8") as file:
+        assert list(parser.parse_stream(file, chunk_size = 4096)) == expected
+
+    # Files that cannot be read again are copied
+    class Pipe(io.StringIO):
+        def seekable(self):
+            return False
+
+    rng = random.Random(19)
+    sources = ["", "  a1  b2 ", "(a1 / b2) c3 (d4 / e5 / f6)", "a1 b2 / c3", "(a1 b2) / c3 d4", "(a1 / b2)*2 / c3"]
+    sources += [random_source(rng) for _ in range(100)]
+    for source in sources:
+        expected = parser.parse(source)
+        for chunk_size in [1, 3, 16, 1000]:
+            assert list(parser.parse_stream(io.StringIO(source), chunk_size)) == expected, source
+            assert list(parser.parse_stream(Pipe(source), chunk_size)) == expected, source
+
+    # Elements are yielded before the rest of the source is read
+    stream = io.StringIO("c1 d2 (e3 f4 (g5)")
+    elements = parser.parse_stream(stream, chunk_size = 4)
+    assert next(elements).to_str() == "c1:time0.25"
+    with pytest.raises(Exception, match="does not have an ending"):
+        list(elements)
+
+def test_threads():
+    import random
+    import threading
+    from shuttle_notation.tests.util_test import random_source
+
+    rng = random.Random(23)
+    sources = [random_source(rng) + rng.choice(["", ":0.5", ":sus2time"]) for _ in range(60)]
+
+    # One parser shared by all threads, with a cache small enough to keep evicting
+    shared = Parser(cache_size = 8)
+    shared.arg_defaults = {"time": Decimal("0.25")}
+    expected = {source: shared.parse_uncached(source) for source in sources}
+
+    # Profiled parses count only their own work, whatever the other threads do
+    profiled = Parser(cache_size = 0)
+    profiled.arg_defaults = shared.arg_defaults
+    profiled.profile = True
+    calls = {}
+    for source in sources:
+        profiled.parse(source)
+        calls[source] = profiled.last_stats.parse_args_calls
+
+    failures = []
+    def work(seed: int):
+        local = random.Random(seed)
+        try:
+            for _ in range(150):
+                source = local.choice(sources)
+                match local.randrange(3):
+                    case 0:
+                        assert shared.parse(source) == expected[source], source
+                    case 1:
+                        assert shared.parse_parallel(source, 2) == expected[source], source
+                    case _:
+                        assert profiled.parse(source) == expected[source], source
+        except Exception as exception:
+            failures.append(exception)
+
+    threads = [threading.Thread(target = work, args = (seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert failures == []
+
+    info = shared.cache_info()
+    assert info.size <= 8
+    assert info.hits + info.misses > 0
+
+    # Counters stay with the thread that set them up
+    results = {}
+    def count(source: str):
+        stats = ParseStats()
+        profiling.state.current = stats
+        try:
+            profiled.parse_uncached(source)
+        finally:
+            profiling.state.current = None
+        results[source] = stats.parse_args_calls
+
+    threads = [threading.Thread(target = count, args = (source,)) for source in sources[:16]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {source: calls[source] for source in sources[:16]}
@@ -66,8 +66,79 @@ def test_all():
     assert stest.arg_source == "fff" 
 
     startest = divide_information(make_element(":ss*s", ElementType.SECTION))
-    assert stest.suffix == ""
+    assert startest.suffix == ""
 
     with pytest.raises(Exception) as exc_info:   
         divide_information(make_element(":fff", ElementType.ATOMIC))
         assert "Malformed input" in exc_info.value
+
+def test_parse_once():
+    import section_parsing
+    tree = section_parsing.build_tree("(a3*2:>0.5)*3:1.0", {">": "sus"})
+    section = tree.elements[0]
+    leaf = section.elements[0]
+
+    assert section.info.repetition == 3
+    assert section.args["time"].value == Decimal("1.0")
+    assert leaf.info.repetition == 2
+    assert "sus" in leaf.args
+
+    # Stored results are reused rather than parsed again
+    assert get_information(leaf) is leaf.info
+    assert get_args(leaf) is leaf.args
+
+    # Args are parsed on demand when no aliases were given
+    lazy = section_parsing.build_tree("a:>0.5").elements[0]
+    assert lazy.args is None
+    assert ">" in get_args(lazy)
+
+def test_scanner_matches_old():
+    import random
+    from fractions import Fraction
+    import scanner
+    from shuttle_notation.benchmarks.old_implementations import divide_information_old, parse_args_old
+    # The old versions build their results from the package modules, which are not the ones imported above
+    from shuttle_notation.parsing.information_parsing import divide_information, parse_args
+
+    def outcome(function, *arguments):
+        try:
+            return function(*arguments)
+        except Exception as exception:
+            return type(exception)
+
+    rng = random.Random(7)
+    alphabet = "abwxz019.:*,+-=;@W"
+    for _ in range(20000):
+        source = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+
+        for etype in ElementType:
+            element = Element()
+            element.information = source
+            element.type = etype
+
+            # The old version never finishes when the repetition part is empty and ends the string
+            _, _, _, repetition, arg_source = scanner.scan_information(source, etype != ElementType.ATOMIC)
+            if repetition == (len(source), len(source)) and arg_source[0] == -1:
+                assert outcome(divide_information, element) == ValueError
+                continue
+
+            assert outcome(divide_information, element) == outcome(divide_information_old, element), (source, etype)
+
+        for numeric in [Decimal, float, Fraction]:
+            aliases = {"a": "amp", "x": "sus"}
+            assert outcome(parse_args, source, aliases, numeric) == outcome(parse_args_old, source, aliases, numeric), source
+
+def test_scanner_spans():
+    import scanner
+
+    assert scanner.scan_information("ab12cd*3:amp0.5") == ((0, 2), (2, 4), (4, 6), (7, 8), (9, 15))
+    assert scanner.scan_information("*3", True) == ((0, 0), (0, 0), (0, 0), (1, 2), (-1, -1))
+    assert scanner.scan_information("x:16") == ((0, 0), (0, 0), (0, 1), (-1, -1), (2, 4))
+
+    source = "0.5,amp*2,sus1time"
+    spans = scanner.scan_args(source)
+    assert [[source[start:end] for start, end in arg] for arg in spans] == [
+        ["", "", "0.5", ""],
+        ["amp", "*", "2", ""],
+        ["sus", "", "1", "time"],
+    ]
@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from playback import *
+from full_parse import Parser
+
+def play(source: str, tempo: float = 60.0, lateness = None, make_callback = None):
+    parser = Parser()
+    clock = VirtualClock(lateness = lateness)
+    emitted = []
+
+    def callback(element):
+        emitted.append((element.to_str(), round(clock.now(), 6)))
+
+    scheduler = Scheduler(parser.iter_parse(source), callback, tempo, clock)
+    if make_callback is not None:
+        scheduler.callback = make_callback(scheduler, clock, callback)
+    asyncio.run(scheduler.run())
+    return emitted, scheduler
+
+def test_onsets():
+    emitted, scheduler = play("a1:1 b2:0.5 c3:0.5 d4:2 e5", tempo = 120)
+    assert emitted == [("a1:time1", 0.0), ("b2:time0.5", 0.5), ("c3:time0.5", 0.75), ("d4:time2", 1.0), ("e5", 2.0)]
+    assert scheduler.stats.count == 5
+    assert scheduler.stats.max == 0.0
+
+def test_drift_compensation():
+    # Every wakeup is 10ms late, but onsets stay on the original grid
+    emitted, scheduler = play("(a1:0.25)*100", lateness = lambda: 0.01)
+    assert [at for _, at in emitted] == [round(i * 0.25 + 0.01, 6) for i in range(100)]
+    assert scheduler.stats.mean == pytest.approx(0.01)
+    assert scheduler.stats.deviation == pytest.approx(0.0, abs=1e-6)
+
+def test_tempo_change():
+    def make_callback(scheduler, clock, record):
+        def callback(element):
+            record(element)
+            if element.index == 2:
+                scheduler.set_tempo(120)
+        return callback
+
+    emitted, _ = play("a1:1 a2:1 a3:1 a4:1", make_callback = make_callback)
+    assert [at for _, at in emitted] == [0.0, 1.0, 1.5, 2.0]
+
+def test_awaitable_callback():
+    # Slow callbacks delay their own element, but not the onsets after it
+    def make_callback(scheduler, clock, record):
+        async def callback(element):
+            record(element)
+            await clock.sleep_until(clock.now() + 0.3)
+        return callback
+
+    emitted, scheduler = play("a1:1 a2:1 a3:1", make_callback = make_callback)
+    assert [at for _, at in emitted] == [0.0, 1.0, 2.0]
+
+def test_stop():
+    def make_callback(scheduler, clock, record):
+        def callback(element):
+            record(element)
+            if element.index == 2:
+                scheduler.stop()
+        return callback
+
+    emitted, scheduler = play("a1 a2 a3 a4", make_callback = make_callback)
+    assert len(emitted) == 2
+    assert not scheduler.running
+
+def test_callback_error():
+    def make_callback(scheduler, clock, record):
+        def callback(element):
+            record(element)
+            if element.index == 2:
+                raise ValueError("device gone")
+        return callback
+
+    parser = Parser()
+    clock = VirtualClock()
+    emitted = []
+    scheduler = Scheduler(parser.iter_parse("a1 a2 a3 a4"), None, 60.0, clock)
+    scheduler.callback = make_callback(scheduler, clock, lambda element: emitted.append(element.to_str()))
+
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.run())
+    assert emitted == ["a1", "a2"]
+    assert not scheduler.running
+
+    # The same scheduler can be run again, continuing with the remaining elements
+    scheduler.callback = lambda element: emitted.append(element.to_str())
+    asyncio.run(scheduler.run())
+    assert emitted == ["a1", "a2", "a3", "a4"]
+    assert not scheduler.running
@@ -41,3 +41,37 @@ def test_information_inheritence():
     a_node = nested_arg_set.elements[1].elements[0].elements[0]
     assert a_node.get_information_array_ordered() == ["::a", "b", "c", ""], \
         "was: " + ",".join([a for a in a_node.get_information_array_ordered()])
+
+def test_matches_old_build_tree():
+    import random
+    from shuttle_notation.tests.util_test import random_source
+    from shuttle_notation.benchmarks.old_implementations import build_tree_old
+    rng = random.Random(2)
+    for _ in range(300):
+        source = random_source(rng)
+        assert section_parsing.build_tree(source).decompile() == build_tree_old(source).decompile(), source
+
+def test_suffix_with_closing_bracket():
+    tree = section_parsing.build_tree("(a b):f)")
+    assert tree.elements[0].information == ":f)"
+    assert tree.decompile() == "((a b):f))"
+
+def test_deep_nesting():
+    depth = 5000
+    tree = section_parsing.build_tree("(" * depth + "a" + ")x" * depth)
+    node = tree
+    for _ in range(depth):
+        node = node.elements[0]
+        assert node.information == "x"
+    assert node.elements[0].information == "a"
+
+def test_alternation_subsection_parent():
+    tree = section_parsing.build_tree("(a b / c):amp0.5")
+    a_node = tree.elements[0].elements[0].elements[0]
+    assert a_node.get_information_array_ordered() == ["a", "", ":amp0.5", ""]
+
+def test_tokens():
+    from tokenizer import tokenize
+    source = "a (b / c)*2"
+    tokens = [(t.type.name, source[t.start:t.end]) for t in tokenize(source)]
+    assert tokens == [("ATOM", "a"), ("OPEN", "("), ("ATOM", "b"), ("ALTERNATION", "/"), ("ATOM", "c"), ("CLOSE", ")*2")], tokens
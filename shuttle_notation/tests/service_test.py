@@ -0,0 +1,120 @@
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import pytest
+from decimal import Decimal
+from service import *
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_parser() -> Parser:
+    parser = Parser()
+    parser.arg_defaults = {"time": Decimal("0.5")}
+    return parser
+
+def test_stream():
+    requests = '"c4 (d2 / e1)"\n\n{"source": "a1*2:sus0.25", "id": 7}\n{"source": 5, "id": "x"}\nnot json\n'
+    output = io.StringIO()
+    serve_stream(make_parser(), io.StringIO(requests), output)
+    responses = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert len(responses) == 4
+    assert responses[0]["id"] is None
+    assert [(e["prefix"], e["index"]) for e in responses[0]["elements"]] == [("c", 4), ("d", 2), ("c", 4), ("e", 1)]
+    assert responses[0]["elements"][0]["args"] == {"time": 0.5}
+    assert responses[1]["id"] == 7
+    assert len(responses[1]["elements"]) == 2
+    assert responses[1]["elements"][0] == {"prefix": "a", "index": 1, "suffix": "", "args": {"sus": 0.25, "time": 0.5}}
+    assert responses[2]["id"] == "x" and "error" in responses[2]
+    assert "error" in responses[3]
+
+def test_reference_errors():
+    output = io.StringIO()
+    serve_stream(make_parser(), io.StringIO('"a1:sus1amp,amp1sus"\n"a1:sus2time"\n'), output)
+    responses = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert "sus -> amp -> sus" in responses[0]["error"]
+    assert responses[1]["elements"][0]["args"] == {"sus": 1, "time": 0.5}
+
+def test_cli():
+    result = subprocess.run(
+        [sys.executable, "-m", "shuttle_notation", "--defaults", '{"time": 0.1}', "--aliases", '{">": "sus"}'],
+        input='"a1:>2"\n"b2 b3"\n', capture_output=True, text=True, cwd=ROOT, timeout=60
+    )
+    responses = [json.loads(line) for line in result.stdout.splitlines()]
+    assert responses[0]["elements"][0]["args"] == {"sus": 2, "time": 0.1}
+    assert len(responses[1]["elements"]) == 2
+
+def test_socket(tmp_path):
+    path = str(tmp_path / "parser.sock")
+    server = ParseServer(path, make_parser())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    results = {}
+    def client(number: int):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(path)
+            stream = connection.makefile("rw")
+            for i in range(20):
+                stream.write(json.dumps({"source": "a" + str(number) + " b" + str(i), "id": i}) + "\n")
+                stream.flush()
+                response = json.loads(stream.readline())
+                assert response["id"] == i
+                results.setdefault(number, []).append(response["elements"][1]["index"])
+
+    clients = [threading.Thread(target=client, args=(n,)) for n in range(4)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    server.shutdown()
+    server.server_close()
+
+    assert results == {n: list(range(20)) for n in range(4)}
+
+    # The socket is removed on close, and a new server replaces a stale one
+    assert not os.path.exists(path)
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    ParseServer(path, make_parser()).server_close()
+    assert not os.path.exists(path)
+
+def test_socket_path_not_a_socket(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("keep me")
+    with pytest.raises(OSError):
+        ParseServer(str(path), make_parser())
+    assert path.read_text() == "keep me"
+
+def test_length_limit(tmp_path):
+    path = str(tmp_path / "parser.sock")
+    server = ParseServer(path, make_parser(), max_length = 100)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(30)
+        connection.connect(path)
+        stream = connection.makefile("rw")
+        # Never finishes expanding, over the limit, and on the limit
+        for source in ["(a / b)*0", "(a1 b2)*51", "(a1 b2)*50"]:
+            stream.write(json.dumps(source) + "\n")
+        stream.flush()
+        responses = [json.loads(stream.readline()) for _ in range(3)]
+    server.shutdown()
+    server.server_close()
+
+    assert "never completes" in responses[0]["error"]
+    assert "102 elements" in responses[1]["error"]
+    assert len(responses[2]["elements"]) == 100
+
+    # No limit when None
+    output = io.StringIO()
+    serve_stream(make_parser(), io.StringIO('"(a1 b2)*51"\n'), output, None)
+    assert len(json.loads(output.getvalue())["elements"]) == 102
@@ -1,5 +1,6 @@
-import pytest
 from util import *
+import section_parsing
+from shuttle_notation.benchmarks.old_implementations import section_split, TreeExpanderOld
 
 # TODO: Split into proper tests
 def test_all():
@@ -113,3 +114,91 @@ def test_all():
     arg_tree_test("0:>1.0", {
             "sus": Decimal("1.0")
     }, defaults={"sus": Decimal("2.0")}, aliases={">": "sus"})
+
+# Random notation strings, mixing sections, alternations and repeats
+def random_source(rng, depth = 3, width = 3):
+    parts = []
+    for _ in range(rng.randint(1, width)):
+        roll = rng.random()
+        if depth > 0 and roll < 0.3:
+            parts.append("(" + random_source(rng, depth - 1, width) + ")")
+        elif depth > 0 and roll < 0.5:
+            alternatives = [random_source(rng, depth - 1, width) for _ in range(rng.randint(2, 3))]
+            parts.append("(" + " / ".join(alternatives) + ")")
+        else:
+            parts.append(rng.choice("abcdefg") + str(rng.randint(0, 9)))
+
+        if rng.random() < 0.2:
+            parts[-1] += "*" + str(rng.randint(1, 3))
+    return " ".join(parts)
+
+def test_tree_expander_matches_old():
+    import random
+    rng = random.Random(1)
+    for _ in range(300):
+        source = random_source(rng)
+        top_element = section_parsing.build_tree(source)
+        expected = TreeExpanderOld().tree_expand(top_element)
+        result = TreeExpander().tree_expand(top_element)
+        assert [id(e) for e in result] == [id(e) for e in expected], source
+
+def test_deep_nesting():
+    # Deeper than the recursion limit
+    top_element = Element()
+    top_element.type = ElementType.SECTION
+    current = top_element
+    for _ in range(5000):
+        current = current.add()
+        current.type = ElementType.SECTION
+    current.add().information = "a"
+    alternation = current.add()
+    alternation.type = ElementType.ALTERNATION_SECTION
+    alternation.add().information = "b"
+    alternation.add().information = "c"
+
+    result = TreeExpander().tree_expand(top_element)
+    assert [e.information for e in result] == ["a", "b", "a", "c"]
+
+def test_iter_expand():
+    import random
+    rng = random.Random(4)
+    sources = ["a*0 b", "(a (b / c) (d)*0)*0 e", "((a / b)*2 c)*3 (d (e / f))*2"] + [random_source(rng) for _ in range(300)]
+    for source in sources:
+        top_element = section_parsing.build_tree(source)
+        expected = TreeExpander().tree_expand(top_element)
+        result = list(TreeExpander().iter_expand(top_element))
+        assert [id(e) for e in result] == [id(e) for e in expected], source
+
+def test_loop_sequence():
+    import random
+    from loop_sequence import LoopSequence
+
+    def names(elements):
+        return " ".join([e.information for e in elements])
+
+    loop = LoopSequence(section_parsing.build_tree("(a / b / c) (d / e)"))
+    assert loop.cycle_length == 3
+    assert [names(loop.iteration(k)) for k in range(7)] == ["a d", "b e", "c d", "a e", "b d", "c e", "a d"]
+    assert names(loop.iteration(10 ** 12)) == "b d"
+
+    loop = LoopSequence(section_parsing.build_tree("x / (y / z)"))
+    assert [names(loop.step()) for _ in range(5)] == ["x", "y", "x", "z", "x"]
+
+    rng = random.Random(11)
+    for _ in range(200):
+        source = random_source(rng)
+        top_element = section_parsing.build_tree(source)
+        loop = LoopSequence(top_element)
+
+        # The first cycle is the full expansion
+        first_cycle = []
+        for _ in range(loop.cycle_length):
+            first_cycle.extend(loop.step())
+        assert first_cycle == TreeExpander().tree_expand(top_element), source
+
+        # Stepping on from there matches computing each iteration directly
+        for k in range(loop.cycle_length, loop.cycle_length + 6):
+            assert loop.step() == loop.iteration(k), source
+
+        loop.seek(2)
+        assert loop.step() == loop.iteration(2)